@@ -1,30 +1,71 @@
-from flask import Flask, render_template, Response, request, jsonify, session, redirect, url_for
-import csv
+from flask import (Flask, render_template, Response, request, jsonify, session, redirect, url_for,
+                   g, has_request_context)
+from flask.json.provider import DefaultJSONProvider
+import functools
 import os
+import re
 import sys
+import threading
 import time
 import hashlib
-from datetime import datetime
+import gzip
+from collections import namedtuple
 from google.oauth2 import id_token
 from google.auth.transport import requests
 import secrets
+import pymysql
 from werkzeug.utils import secure_filename
 
+try:
+    import orjson  # optional: faster JSON encoding and request parsing
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # optional: smaller SVG responses for browsers that accept br
+except ImportError:
+    brotli = None
+
 import lab_utils
 from lab_utils import (
-    TURTLEBOT_STATIONS, UR7E_STATIONS,
-    ADMIN_USERS_FILE, UPLOAD_FOLDER, CALENDAR_PATH,
-    DESK_REGEX,
+    TURTLEBOT_STATIONS, UR7E_STATIONS, STATION_TYPE,
+    ADMIN_USERS_FILE, UPLOAD_FOLDER, CALENDAR_PATH, SVG_PATH, ABOUT_PATH,
+    DESK_PATTERN,
     DATA_SOURCE, get_db_connection,
-    get_current_lab_event, get_manual_overrides,
+    get_current_lab_event, get_manual_overrides, iter_csv_columns, load_cached,
     # Data access layer
-    get_queue, add_to_queue, remove_from_queue, reorder_queue, reposition_queue,
+    get_all_queues, get_page_bundle, add_to_queue, remove_from_queue, reorder_queue, reposition_queue,
     get_claimed_stations, get_pending_claim, mark_claim_confirmed,
-    set_manual_override,
+    set_manual_override, overrides_version, queues_version,
 )
 
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Keeps Flask's key sorting, str-converted non-str keys and fallbacks for
+    other types (dates still become HTTP dates); only the non-ASCII output
+    differs, as raw UTF-8 instead of ``\\u`` escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default),
+                            option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 # Google OAuth configuration
 GOOGLE_CLIENT_ID = "22576242210-5dqoo2haju5f7t0qf5cnuq2hpbhstjpe.apps.googleusercontent.com"
@@ -57,7 +98,36 @@ GREEN = '#00A676'
 RED = '#EB9486'
 YELLOW = '#F3DE8A'  # Claimed/pending
 
+# Bit n set for each station n of the type
+_TURTLEBOT_MASK = sum(1 << n for n in TURTLEBOT_STATIONS)
+_UR7E_MASK = sum(1 << n for n in UR7E_STATIONS)
+
+
+def _station_list_texts(stations):
+    """Map every subset bitmask of ``stations`` to its sorted, comma-joined list.
+
+    Each type has at most a few dozen subsets, so the alt text looks its
+    station lists up instead of building them.
+    """
+    texts = {0: ''}
+    for n in sorted(stations):
+        label = str(n)
+        texts.update({mask | 1 << n: f'{text}, {label}' if text else label
+                      for mask, text in texts.items()})
+    return texts
+
+
+_TURTLEBOT_LIST_TEXT = _station_list_texts(TURTLEBOT_STATIONS)
+_UR7E_LIST_TEXT = _station_list_texts(UR7E_STATIONS)
+
+# The station rows reduced in one pass (_build_lab_view): bitmasks of the
+# stations with data and of the occupied ones, and each station's desk color
+LabView = namedtuple('LabView', ['present', 'occupied', 'station_colors'])
+
 ALLOWED_EXTENSIONS = {'ics'}
+# Copy uploads in 1 MiB chunks (Werkzeug's default is 16 KiB), so a large
+# calendar is written with a handful of syscalls
+_UPLOAD_BUFFER_SIZE = 1 << 20
 
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -90,44 +160,202 @@ else:
 # ---------------------------------------------------------------------------
 # Caches
 # ---------------------------------------------------------------------------
-# SVG cache: avoid re-reading + regex-replacing on every request
-_svg_cache = {'content': None, 'hash': None, 'time': 0}
-_SVG_CACHE_TTL = 5  # seconds
-
-# About page content (rarely changes)
-_about_content = None
+# SVG cache: rendered body (plain + gzip) for the current desk colors
+_svg_cache = {'content': None, 'gzip': None, 'br': None, 'hash': None}
+_svg_lock = threading.Lock()
+# Headers shared by every SVG response (200 and 304); once stale, a copy
+# must be revalidated (a cheap 304) rather than reused
+_SVG_HEADERS = {'Cache-Control': 'public, max-age=5, must-revalidate', 'Vary': 'Accept-Encoding'}
+# A ?v= URL naming the current state hash always maps to the same bytes
+# (the hash is derived from the content), so browsers may keep it for good
+_SVG_VERSIONED_HEADERS = {'Cache-Control': 'public, max-age=31536000, immutable',
+                          'Vary': 'Accept-Encoding'}
+
+# Raw station rows from the DB: a short TTL lets a burst of page loads and
+# polls share one query, and the last good rows are kept as a fallback.
+# 'version' is lab_utils.overrides_version() when the rows were fetched, so
+# an override made through any worker invalidates every worker's rows.
+_station_rows_cache = {'rows': None, 'time': 0, 'version': 0}
+_STATION_ROWS_TTL = 2  # seconds
+
+# Last station CSV rows from lab_utils.load_cached().  The file is only
+# stat'ed once per interval; the station checker rewrites it far less often
+# than pages are polled.
+_station_csv_cache = {'data': None, 'checked': 0}
+_STATION_CSV_CHECK_INTERVAL = 0.5  # seconds
+
+# About page content is static between deploys; read it once at import
+# (a missing file leaves the page empty rather than breaking app import)
+try:
+    with open(ABOUT_PATH, 'r') as f:
+        _about_content = f.read()
+except OSError as e:
+    print(f"Error reading about page: {e}")
+    _about_content = ''
+# The rendered about page depends only on _about_content; built on first request
+_about_page = {'html': None, 'etag': None}
 
 # Admin users cache
-_admin_cache = {'emails': None, 'time': 0, 'mtime': 0}
+_admin_cache = {'emails': None, 'time': 0}
 _ADMIN_CACHE_TTL = 60  # seconds
+_admin_lock = threading.Lock()
 
+# Last computed lab status, keyed on (station rows, calendar event)
+_lab_status_cache = {'key': None, 'value': None}
+
+# Serialized /api/lab-data body shared by all pollers for a short TTL.
+# 'version' is the (overrides, queues) version it was built at, so a write
+# through any worker is visible to the refresh that follows it.
+_lab_data_cache = {'body': None, 'etag': None, 'time': 0, 'version': None}
+_LAB_DATA_TTL = 1  # seconds
+_lab_data_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# SVG template
+# ---------------------------------------------------------------------------
+def _split_svg(svg):
+    """Split the SVG around each desk's fill value, walking it once.
+
+    Returns (literals, desk_stations, default_fills): the SVG is
+    ``literals[0] + fill(desk_stations[0]) + literals[1] + ...``, and
+    default_fills maps each station number to the fill the SVG originally
+    had, for desks with no station data.
+    """
+    literals, desk_stations, default_fills = [], [], {}
+    last = 0
+    for m in DESK_PATTERN.finditer(svg):
+        key = int(m.group(2))
+        literals.append(svg[last:m.end(1)])
+        desk_stations.append(key)
+        default_fills[key] = svg[m.end(1):m.start(3)]
+        last = m.start(3)
+    literals.append(svg[last:])
+    return tuple(literals), tuple(desk_stations), default_fills
+
+
+def _render_svg(station_colors):
+    """Join the SVG literals with each desk's color (original fill if unknown).
+
+    ``station_colors`` maps station number to fill color.  The literals are
+    kept pre-encoded, so the result is the UTF-8 body and only the short
+    fill values are encoded per render.
+    """
+    parts = [None] * (2 * len(_SVG_DESK_STATIONS) + 1)
+    parts[0::2] = _SVG_LITERALS
+    parts[1::2] = [(station_colors.get(n) or _SVG_DEFAULT_FILLS[n]).encode('utf-8')
+                   for n in _SVG_DESK_STATIONS]
+    return b''.join(parts)
+
+
+# The SVG file is static; do the regex work once at import
+with open(SVG_PATH, 'r') as f:
+    _svg_source = f.read()
+    _SVG_LITERALS, _SVG_DESK_STATIONS, _SVG_DEFAULT_FILLS = _split_svg(_svg_source)
+    _SVG_LITERALS = tuple(literal.encode('utf-8') for literal in _SVG_LITERALS)
+
+# Identifies this copy of the SVG file, so versions change on redeploy
+_SVG_TEMPLATE_ID = hashlib.md5(_svg_source.encode('utf-8')).hexdigest()[:8]
+del _svg_source
+
+# One character per desk color in the SVG version string
+_DESK_COLOR_CODES = {GREEN: 'g', RED: 'r', YELLOW: 'y'}
+
+
+def _get_station_rows_db():
+    """Fetch (station, occupied) rows from MySQL, cached for a short TTL.
+
+    Manual overrides are joined in by the same query, so one round trip
+    returns the effective state of every station.  Cached rows are dropped
+    early when an override has been set since they were fetched.  If the
+    database is unreachable, the last rows fetched successfully are served
+    (stale) instead of failing the request.
+    """
+    global _station_rows_cache
+
+    now = time.time()
+    version = overrides_version()
+    if (_station_rows_cache['rows'] is not None
+            and now - _station_rows_cache['time'] < _STATION_ROWS_TTL
+            and _station_rows_cache['version'] == version):
+        return _station_rows_cache['rows']
+
+    try:
+        # Connection goes back to the lab_utils pool on exit
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT s.station, COALESCE(o.override_occupied, s.occupied) "
+                "FROM stations s LEFT JOIN manual_overrides o ON o.station = s.station")
+            rows = cursor.fetchall()
+    except pymysql.Error as e:
+        if _station_rows_cache['rows'] is None:
+            raise
+        print(f"Error reading stations from DB, serving last known state: {e}")
+        return _station_rows_cache['rows']
+
+    _station_rows_cache = {'rows': rows, 'time': now, 'version': version}
+    return rows
+
+
+def _parse_station_csv(f):
+    return [
+        (int(station), occupied[:1] in ('t', 'T'))
+        for station, occupied in iter_csv_columns(f, 'station', 'occupied')
+    ]
+
+
+def _get_station_rows_csv():
+    """Parse (station, occupied) rows from CSV_PATH, reparsing only when it changes.
+
+    Within _STATION_CSV_CHECK_INTERVAL of the last check the cached rows are
+    returned without a stat, so a change shows up at most that late.
+    """
+    global _station_csv_cache
+
+    now = time.monotonic()
+    cache = _station_csv_cache
+    if cache['data'] is not None and now - cache['checked'] < _STATION_CSV_CHECK_INTERVAL:
+        return cache['data']
+
+    data = load_cached(CSV_PATH, _parse_station_csv)
+    if data is None:
+        raise FileNotFoundError(f"Station status file not found: {CSV_PATH}")
+    _station_csv_cache = {'data': data, 'checked': now}
+    return data
+
+
+def _get_station_data_csv():
+    """CSV station rows with manual overrides applied."""
+    data = _get_station_rows_csv()
 
-def get_station_data():
-    """Get station data from configured source (CSV or database), applying manual overrides."""
-    if DATA_SOURCE == 'database':
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT station, occupied FROM stations")
-        data = cursor.fetchall()
-        cursor.close()
-        conn.close()
-    else:  # CSV mode
-        data = []
-        with open(CSV_PATH, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                station_num = int(row['station'])
-                is_occupied = row['occupied'].lower() == 'true'
-                data.append((station_num, is_occupied))
-
-    # Apply manual overrides
     overrides = get_manual_overrides()
     if overrides:
         data = [
             (station_num, overrides.get(station_num, is_occupied))
             for station_num, is_occupied in data
         ]
+    return data
+
+
+# DATA_SOURCE is fixed at import, so pick the reader once instead of
+# branching on every call
+_fetch_station_data = _get_station_rows_db if DATA_SOURCE == 'database' else _get_station_data_csv
+
+
+def get_station_data():
+    """Get station data from configured source (CSV or database), applying manual overrides.
+
+    Memoized on ``flask.g`` so helpers called within the same request share
+    one read.
+    """
+    in_request = has_request_context()
+    if in_request and 'station_data' in g:
+        return g.station_data
 
+    data = _fetch_station_data()
+
+    if in_request:
+        g.station_data = data
     return data
 
 
@@ -172,107 +400,215 @@ def determine_lab_state(total_available):
 
     return STATE_OPEN
 
-def get_queue_data():
-    """Get queue data for both robot types."""
+def _queue_data(queues):
     return {
-        'ur7e': get_queue('ur7e'),
-        'turtlebot': get_queue('turtlebot'),
+        'ur7e': queues['ur7e'],
+        'turtlebot': queues['turtlebot'],
     }
 
+
+def get_queue_data():
+    """Get queue data for both robot types (memoized on ``flask.g``)."""
+    in_request = has_request_context()
+    if in_request and 'queue_data' in g:
+        return g.queue_data
+
+    data = _queue_data(get_all_queues())
+
+    if in_request:
+        g.queue_data = data
+    return data
+
+
+def load_page_bundle():
+    """Prefetch queues and claimed stations together for a status page.
+
+    Stores them on ``flask.g`` where get_queue_data() and get_svg_state()
+    pick them up, so a page view reads both in one go (one DB connection)
+    rather than once per helper.
+    """
+    bundle = get_page_bundle()
+    g.queue_data = _queue_data(bundle.queues)
+    g.claimed_stations = bundle.claimed_stations
+
+def _build_lab_view(station_data):
+    """Walk the station rows once into a LabView.
+
+    Rows for stations outside the two robot types are ignored; a station
+    listed twice takes its last row, as ``dict(station_data)`` would.
+    """
+    present = occupied = 0
+    station_colors = {}
+    for station_num, is_occupied in station_data:
+        if station_num not in STATION_TYPE:
+            continue
+        bit = 1 << station_num
+        present |= bit
+        if is_occupied:
+            occupied |= bit
+            station_colors[station_num] = RED
+        else:
+            occupied &= ~bit
+            station_colors[station_num] = GREEN
+    return LabView(present, occupied, station_colors)
+
+
+def _count_open(view, type_mask):
+    """Open stations of one robot type (``type_mask``) in ``view``."""
+    return (view.present & ~view.occupied & type_mask).bit_count()
+
+
+def _lab_view_alt_text(view):
+    """Alt text for a LabView, listing stations in order by type and state."""
+    open_mask = view.present & ~view.occupied
+    return _format_alt_text(_TURTLEBOT_LIST_TEXT[open_mask & _TURTLEBOT_MASK],
+                            _TURTLEBOT_LIST_TEXT[view.occupied & _TURTLEBOT_MASK],
+                            _UR7E_LIST_TEXT[open_mask & _UR7E_MASK],
+                            _UR7E_LIST_TEXT[view.occupied & _UR7E_MASK])
+
+
+def compute_lab_view():
+    """LabView of the current station data (memoized on ``flask.g``)."""
+    in_request = has_request_context()
+    if in_request and 'lab_view' in g:
+        return g.lab_view
+
+    view = _build_lab_view(get_station_data())
+
+    if in_request:
+        g.lab_view = view
+    return view
+
+
 def generate_lab_alt_text(station_data):
     """Generate descriptive alt text for screen readers."""
-    turtlebot_open = []
-    turtlebot_occupied = []
-    ur7e_open = []
-    ur7e_occupied = []
+    return _lab_view_alt_text(_build_lab_view(station_data))
 
-    for station_num, is_occupied in station_data:
-        if station_num in TURTLEBOT_STATIONS:
-            if is_occupied:
-                turtlebot_occupied.append(station_num)
-            else:
-                turtlebot_open.append(station_num)
-        elif station_num in UR7E_STATIONS:
-            if is_occupied:
-                ur7e_occupied.append(station_num)
-            else:
-                ur7e_open.append(station_num)
 
+def _format_alt_text(turtlebot_open, turtlebot_occupied, ur7e_open, ur7e_occupied):
+    """Build the alt text from already-joined station lists ('' when empty)."""
     # Build descriptive text
     parts = ["Cory 105 lab room layout showing station availability."]
 
     # Turtlebot stations
     if turtlebot_open:
-        parts.append(f"Turtlebot stations open: {', '.join(map(str, sorted(turtlebot_open)))}.")
+        parts.append(f"Turtlebot stations open: {turtlebot_open}.")
     if turtlebot_occupied:
-        parts.append(f"Turtlebot stations occupied: {', '.join(map(str, sorted(turtlebot_occupied)))}.")
+        parts.append(f"Turtlebot stations occupied: {turtlebot_occupied}.")
 
     # UR7e stations
     if ur7e_open:
-        parts.append(f"UR7e stations open: {', '.join(map(str, sorted(ur7e_open)))}.")
+        parts.append(f"UR7e stations open: {ur7e_open}.")
     if ur7e_occupied:
-        parts.append(f"UR7e stations occupied: {', '.join(map(str, sorted(ur7e_occupied)))}.")
+        parts.append(f"UR7e stations occupied: {ur7e_occupied}.")
 
     return " ".join(parts)
 
+@functools.lru_cache(maxsize=256)
 def allowed_file(filename):
     """Check if file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
 def is_admin_user(email):
-    """Check if the given email is in the admin users list (cached)."""
-    global _admin_cache
+    """Check if the given email is in the admin users list (cached).
+
+    ``email`` is expected lowercase; current_user_is_admin() folds the
+    session email once per request.
 
+    Within the TTL the cached list is used without touching the file; after
+    it, one thread refreshes the cache while concurrent callers wait for
+    its result instead of re-reading the file themselves.
+    """
     now = time.time()
+    cache = _admin_cache
+    if cache['emails'] is None or now - cache['time'] >= _ADMIN_CACHE_TTL:
+        with _admin_lock:
+            # Another thread may have refreshed it while this one waited
+            cache = _admin_cache
+            if cache['emails'] is None or now - cache['time'] >= _ADMIN_CACHE_TTL:
+                cache = _refresh_admin_cache(now)
+    return email in cache['emails']
+
+
+def current_user_is_admin():
+    """True if the signed-in user is an admin; checked once per request (``flask.g``).
+
+    The session email is kept as Google returned it (queue and claim rows
+    match it verbatim), so it is lowercased here for the admin lookup.
+    """
+    if 'is_admin' not in g:
+        user = session.get('user')
+        g.is_admin = user is not None and is_admin_user(user['email'].lower())
+    return g.is_admin
 
-    try:
-        mtime = os.path.getmtime(ADMIN_USERS_FILE) if os.path.exists(ADMIN_USERS_FILE) else 0
-    except OSError:
-        mtime = 0
 
-    if (_admin_cache['emails'] is not None
-            and now - _admin_cache['time'] < _ADMIN_CACHE_TTL
-            and mtime == _admin_cache['mtime']):
-        return email.lower() in _admin_cache['emails']
+def require_admin(view):
+    """Reject JSON API requests from signed-out (401) or non-admin (403) users."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'user' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
+        if not current_user_is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
 
-    if not os.path.exists(ADMIN_USERS_FILE):
-        _admin_cache = {'emails': set(), 'time': now, 'mtime': mtime}
-        return False
+
+def _parse_admin_users(f):
+    return frozenset(
+        line.lower() for line in map(str.strip, f)
+        if line and not line.startswith('#'))
+
+
+def _refresh_admin_cache(now):
+    """Reload the admin list if ADMIN_USERS_FILE changed; return the new cache.
+
+    lab_utils.load_cached() stats the file and only re-reads it when it
+    changed.  Call with _admin_lock held.
+    """
+    global _admin_cache
 
     try:
-        with open(ADMIN_USERS_FILE, 'r') as f:
-            admin_emails = set()
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    admin_emails.add(line.lower())
-        _admin_cache = {'emails': admin_emails, 'time': now, 'mtime': mtime}
-        return email.lower() in admin_emails
+        admin_emails = load_cached(ADMIN_USERS_FILE, _parse_admin_users, frozenset())
     except Exception as e:
         print(f"Error reading admin users file: {e}")
-        return False
+        # Not stored, so the next call retries the read
+        return {'emails': frozenset(), 'time': now}
+
+    _admin_cache = {'emails': admin_emails, 'time': now}
+    return _admin_cache
 
 
 def get_lab_status():
-    """Calculate lab status from configured data source."""
-    turtlebots_available = 0
-    ur7es_available = 0
-    station_data = list(get_station_data())
+    """Calculate lab status from configured data source.
 
-    for station_num, is_occupied in station_data:
-        if not is_occupied:
-            if station_num in TURTLEBOT_STATIONS:
-                turtlebots_available += 1
-            elif station_num in UR7E_STATIONS:
-                ur7es_available += 1
+    The result only depends on the station rows and the current calendar
+    event, so it is reused until either changes (skipping the counts and
+    alt-text sorting on repeat polls).
+    """
+    global _lab_status_cache
 
-    total_available = turtlebots_available + ur7es_available
-    state = determine_lab_state(total_available)
+    # Compared by equality, not hashed, so the rows needn't be copied to a
+    # tuple; they come from caches that replace rather than mutate them
+    station_data = get_station_data()
+    event = get_current_lab_event()
 
     # Queue is only active during 106A OH and 106B Lab Sections
     queue_active = lab_utils.is_queue_active_time()
 
+    key = (station_data, event['type'], event['class'], queue_active)
+    if _lab_status_cache['key'] == key:
+        return _lab_status_cache['value']
+
+    # One walk of the rows feeds the counts, the alt text and the SVG
+    view = compute_lab_view()
+    turtlebots_available = _count_open(view, _TURTLEBOT_MASK)
+    ur7es_available = _count_open(view, _UR7E_MASK)
+
+    total_available = turtlebots_available + ur7es_available
+    state = determine_lab_state(total_available)
+
     # Show queues only when queue is active AND that robot type is full
     show_ur7e_queue = queue_active and (ur7es_available == 0)
     show_turtlebot_queue = queue_active and (turtlebots_available == 0)
@@ -280,7 +616,7 @@ def get_lab_status():
     # Always show the book robot button
     show_book_robot = True
 
-    return {
+    status = {
         'state': state,
         'color': STATE_COLORS[state],
         'turtlebots_available': turtlebots_available,
@@ -288,26 +624,39 @@ def get_lab_status():
         'queue_active': queue_active,
         'show_ur7e_queue': show_ur7e_queue,
         'show_turtlebot_queue': show_turtlebot_queue,
-        'alt_text': generate_lab_alt_text(station_data),
+        'alt_text': _lab_view_alt_text(view),
         'show_book_robot': show_book_robot
     }
+    _lab_status_cache = {'key': key, 'value': status}
+    return status
 
 
 @app.route('/')
 def index():
+    load_page_bundle()
     lab_status = get_lab_status()
     queue = get_queue_data()
-    return render_template('index.html', lab_status=lab_status, queue=queue)
+    return render_template('index.html', lab_status=lab_status, queue=queue,
+                           svg_version=get_svg_state()[1])
 
 
 @app.route('/about')
 def about():
-    """Display website_about.md content on the about page (cached)."""
-    global _about_content
-    if _about_content is None:
-        with open('website_about.md', 'r') as f:
-            _about_content = f.read()
-    return render_template('about.html', readme_content=_about_content)
+    """Display website_about.md content on the about page (read at import).
+
+    The page is rendered once and served with an ETag, so revisits get a 304.
+    """
+    global _about_page
+    page = _about_page
+    if page['html'] is None:
+        html = render_template('about.html', readme_content=_about_content).encode('utf-8')
+        page = _about_page = {
+            'html': html,
+            'etag': hashlib.blake2b(html, digest_size=8).hexdigest(),
+        }
+    resp = Response(page['html'], mimetype='text/html')
+    resp.set_etag(page['etag'])
+    return resp.make_conditional(request)
 
 
 @app.route('/admin')
@@ -320,14 +669,14 @@ def admin():
                              show_signin=True)
 
     # Check if user is an admin
-    user_email = session['user']['email']
-    if not is_admin_user(user_email):
+    if not current_user_is_admin():
         return render_template('admin_unauthorized.html',
                              message='Sorry! You do not have admin access. Please email Daniel Municio for admin access.',
                              show_signin=False)
 
     # User is authenticated and is an admin
-    lab_status = get_lab_status()
+    # Copied: get_lab_status() returns the shared cached dict
+    lab_status = dict(get_lab_status())
     # Admin page always shows both queues for management
     lab_status['show_turtlebot_queue'] = True
     lab_status['show_ur7e_queue'] = True
@@ -338,13 +687,9 @@ def admin():
 @app.route('/admin/upload-calendar', methods=['GET', 'POST'])
 def upload_calendar():
     """Upload course calendar ICS file - admin only."""
-    # Check if user is authenticated
-    if 'user' not in session:
-        return redirect(url_for('admin'))
-
-    # Check if user is an admin
-    user_email = session['user']['email']
-    if not is_admin_user(user_email):
+    # Signed-out and non-admin users both go back to the admin page, which
+    # explains which one applies
+    if not current_user_is_admin():
         return redirect(url_for('admin'))
 
     if request.method == 'POST':
@@ -363,7 +708,7 @@ def upload_calendar():
             filename = secure_filename(file.filename)
             # Save with a consistent name for the course calendar
             filepath = os.path.join(UPLOAD_FOLDER, 'course_calendar.ics')
-            file.save(filepath)
+            file.save(filepath, buffer_size=_UPLOAD_BUFFER_SIZE)
             return jsonify({
                 'success': True,
                 'message': 'Course calendar uploaded successfully!',
@@ -376,57 +721,100 @@ def upload_calendar():
     return render_template('upload_calendar.html')
 
 
-@app.route('/lab_room.svg')
-def get_svg():
-    """Serve the SVG with dynamically updated desk colors.
+def get_svg_state():
+    """Return ``(station_colors, state_hash)`` for the current desk colors.
 
-    Uses pre-compiled regex patterns and a short TTL cache so that rapid
-    requests (HTML page + embedded <img>) don't duplicate work.
+    The hash identifies the rendered SVG: the template id followed by one
+    color code per desk in SVG order, so it is built with a single join
+    (no sorting or digest) and is identical across gunicorn workers.  It
+    doubles as the SVG's ETag and as the ``svg_version`` the polling
+    client uses to decide whether the image needs re-fetching.  Memoized
+    on ``flask.g``.
     """
-    global _svg_cache
+    in_request = has_request_context()
+    if in_request and 'svg_state' in g:
+        return g.svg_state
 
-    now = time.time()
+    if in_request and 'claimed_stations' in g:
+        claimed_stations = g.claimed_stations
+    else:
+        claimed_stations = get_claimed_stations()
+    # Occupancy colors come from the shared lab view; claims override them
+    station_colors = dict(compute_lab_view().station_colors)
+    for station_num in claimed_stations:
+        if station_num in station_colors:
+            station_colors[station_num] = YELLOW
 
-    # Build a fingerprint of current station state for cache invalidation
-    claimed_stations = get_claimed_stations()
-    station_colors = {}
-    for station_num, is_occupied in get_station_data():
-        if station_num in claimed_stations:
-            color = YELLOW
-        elif is_occupied:
-            color = RED
-        else:
-            color = GREEN
-        station_colors[str(station_num)] = color
+    state_hash = _SVG_TEMPLATE_ID + '-' + ''.join(
+        [_DESK_COLOR_CODES.get(station_colors.get(n), '_') for n in _SVG_DESK_STATIONS])
 
-    state_hash = hashlib.md5(str(sorted(station_colors.items())).encode()).hexdigest()
+    if in_request:
+        g.svg_state = (station_colors, state_hash)
+    return station_colors, state_hash
 
-    # Return cached SVG if still valid
-    if (_svg_cache['content'] is not None
-            and _svg_cache['hash'] == state_hash
-            and now - _svg_cache['time'] < _SVG_CACHE_TTL):
-        return Response(
-            _svg_cache['content'],
-            mimetype='image/svg+xml',
-            headers={'Cache-Control': 'public, max-age=5', 'ETag': state_hash},
-        )
 
-    # Read the SVG file and update desk colors using pre-compiled patterns
-    with open('static/lab_room.svg', 'r') as f:
-        svg_content = f.read()
+@app.route('/lab_room.svg')
+def get_svg():
+    """Serve the SVG with dynamically updated desk colors.
 
-    for station_num, color in station_colors.items():
-        pattern = DESK_REGEX.get(station_num)
-        if pattern:
-            svg_content = pattern.sub(rf'\1{color}\2', svg_content)
+    Joins the desk colors with SVG segments split once at import (no regex
+    work per request).  The rendered SVG and its gzip (and, with the brotli
+    package installed, br) encodings are cached until the desk colors
+    change, and responses carry an ETag so browsers can revalidate with a
+    304 instead of downloading the body again.  Pages link the image as
+    ``?v=<state hash>``; a request for the current version is marked
+    immutable, so the browser doesn't ask again until the colors change.
+    """
+    global _svg_cache
 
-    _svg_cache = {'content': svg_content, 'hash': state_hash, 'time': now}
+    station_colors, state_hash = get_svg_state()
 
-    return Response(
-        svg_content,
-        mimetype='image/svg+xml',
-        headers={'Cache-Control': 'public, max-age=5', 'ETag': state_hash},
-    )
+    # Pick the encoding first: the ETag depends on it, and a revalidation
+    # that still matches is answered before any rendering happens
+    if brotli is not None and request.accept_encodings['br']:
+        encoding = 'br'
+    elif request.accept_encodings['gzip']:
+        encoding = 'gzip'
+    else:
+        encoding = None
+    etag = f'{state_hash}-{encoding}' if encoding else state_hash
+    # A stale ?v= gets the current image, which must not be cached under it
+    headers = _SVG_VERSIONED_HEADERS if request.args.get('v') == state_hash else _SVG_HEADERS
+
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304, headers=headers)
+        resp.set_etag(etag)
+        return resp
+
+    cache = _svg_cache
+    if cache['hash'] != state_hash:
+        with _svg_lock:
+            # Another thread may have rendered this state while we waited
+            cache = _svg_cache
+            if cache['hash'] != state_hash:
+                # Rendered straight to bytes; responses send them as-is
+                svg_bytes = _render_svg(station_colors)
+                cache = _svg_cache = {
+                    'content': svg_bytes,
+                    'gzip': gzip.compress(svg_bytes, compresslevel=6),
+                    # Quality 5: most of br's size win at a fraction of q11's CPU
+                    'br': brotli.compress(svg_bytes, quality=5) if brotli is not None else None,
+                    'hash': state_hash,
+                }
+
+    resp = Response(cache[encoding or 'content'], mimetype='image/svg+xml',
+                    headers=headers)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.set_etag(etag)
+    return resp
+
+
+def _dumps_json(obj):
+    """Encode ``obj`` as UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return app.json.dumps(obj).encode('utf-8')
 
 
 @app.route('/api/lab-data')
@@ -434,14 +822,98 @@ def api_lab_data():
     """JSON endpoint for auto-refresh polling.
 
     Returns lab status and queue data so the frontend can update without
-    a full page reload.
+    a full page reload, plus the current SVG version so the client only
+    re-fetches the image when desk colors changed.  The serialized body is
+    shared by every poller for _LAB_DATA_TTL seconds, or until an override
+    or queue write, and carries an ETag; polls that see no change get an
+    empty 304.
     """
-    lab_status = get_lab_status()
-    queue = get_queue_data()
-    return jsonify({
-        'status': lab_status,
-        'queue': queue,
-    })
+    global _lab_data_cache
+
+    now = time.time()
+    version = (overrides_version(), queues_version())
+    cache = _lab_data_cache
+    if (cache['body'] is None or now - cache['time'] >= _LAB_DATA_TTL
+            or cache['version'] != version):
+        with _lab_data_lock:
+            # Pollers that queued behind the rebuild reuse its result
+            cache = _lab_data_cache
+            if (cache['body'] is None or now - cache['time'] >= _LAB_DATA_TTL
+                    or cache['version'] != version):
+                load_page_bundle()
+                body = _dumps_json({
+                    'status': get_lab_status(),
+                    'queue': get_queue_data(),
+                    'svg_version': get_svg_state()[1],
+                })
+                cache = _lab_data_cache = {
+                    'body': body,
+                    'etag': hashlib.blake2b(body, digest_size=8).hexdigest(),
+                    'time': now,
+                    'version': version,
+                }
+
+    resp = Response(cache['body'], mimetype='application/json')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.set_etag(cache['etag'])
+    return resp.make_conditional(request)
+
+
+# One google-auth transport (and its HTTP session) shared by every login
+_google_request = requests.Request()
+
+# Google's public signing certs: {url: (expires_at, response)}
+_google_certs_cache = {}
+_GOOGLE_CERTS_DEFAULT_TTL = 300  # seconds, when the response has no max-age
+_MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+def _google_transport(url, method='GET', **kwargs):
+    """google-auth transport that caches GET responses for their max-age.
+
+    verify_oauth2_token() fetches Google's signing certs on every call;
+    serving them from memory leaves only the local signature check.
+    """
+    if method != 'GET':
+        return _google_request(url, method=method, **kwargs)
+
+    now = time.time()
+    cached = _google_certs_cache.get(url)
+    if cached is not None and now < cached[0]:
+        return cached[1]
+
+    response = _google_request(url, method=method, **kwargs)
+    if response.status == 200:
+        match = _MAX_AGE_PATTERN.search(response.headers.get('cache-control', ''))
+        ttl = int(match.group(1)) if match else _GOOGLE_CERTS_DEFAULT_TTL
+        _google_certs_cache[url] = (now + ttl, response)
+    return response
+
+
+# Verified ID tokens: {token: (expires_at, idinfo)}, so a retried or
+# double-submitted credential skips the signature check
+_id_token_cache = {}
+_ID_TOKEN_CACHE_TTL = 60  # seconds, never past the token's own exp
+_ID_TOKEN_CACHE_MAX = 1024
+
+
+def _verify_google_token(token):
+    """Verify a Google ID token, reusing the result for a repeat of the same token."""
+    global _id_token_cache
+
+    now = time.time()
+    cached = _id_token_cache.get(token)
+    if cached is not None and now < cached[0]:
+        return cached[1]
+
+    idinfo = id_token.verify_oauth2_token(token, _google_transport, GOOGLE_CLIENT_ID)
+
+    if len(_id_token_cache) >= _ID_TOKEN_CACHE_MAX:
+        _id_token_cache = {t: entry for t, entry in _id_token_cache.items() if now < entry[0]}
+        if len(_id_token_cache) >= _ID_TOKEN_CACHE_MAX:
+            _id_token_cache = {}
+    _id_token_cache[token] = (min(now + _ID_TOKEN_CACHE_TTL, idinfo.get('exp', 0)), idinfo)
+    return idinfo
 
 
 @app.route('/api/auth/google', methods=['POST'])
@@ -451,11 +923,7 @@ def google_auth():
         token = request.json.get('credential')
 
         # Verify the token
-        idinfo = id_token.verify_oauth2_token(
-            token,
-            requests.Request(),
-            GOOGLE_CLIENT_ID
-        )
+        idinfo = _verify_google_token(token)
 
         # Verify the domain
         email = idinfo.get('email')
@@ -493,22 +961,45 @@ def get_current_user():
     return jsonify({'error': 'Not authenticated'}), 401
 
 
+# Allowed values and error messages for enumerated request fields
+_FIELD_CHOICES = {
+    'queue_type': (frozenset(('turtlebot', 'ur7e')), 'Invalid queue type'),
+    'direction': (frozenset(('up', 'down')), 'Invalid direction'),
+}
+
+
+def _json_body():
+    """The request's JSON object, or {} if the body isn't one."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+
+def _invalid_choice(data, *fields):
+    """Error message for the first of ``fields`` with a disallowed value in ``data``, else None."""
+    for field in fields:
+        allowed, message = _FIELD_CHOICES[field]
+        value = data.get(field)
+        if not isinstance(value, str) or value not in allowed:
+            return message
+    return None
+
+
 @app.route('/api/queue/add', methods=['POST'])
 def api_add_to_queue():
     """Add authenticated user to specified queue."""
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
 
-    # Check if queue is currently active
-    lab_status = get_lab_status()
-    if not lab_status.get('queue_active'):
+    # Check if queue is currently active (the only part of the lab status
+    # needed here, so skip building the rest of it)
+    if not lab_utils.is_queue_active_time():
         return jsonify({'error': 'Queue is only available during 106A Lab OH and 106B Lab Sections'}), 403
 
-    data = request.json
-    queue_type = data.get('queue_type')  # 'turtlebot' or 'ur7e'
-
-    if queue_type not in ['turtlebot', 'ur7e']:
-        return jsonify({'error': 'Invalid queue type'}), 400
+    data = _json_body()
+    error = _invalid_choice(data, 'queue_type')
+    if error:
+        return jsonify({'error': error}), 400
+    queue_type = data['queue_type']
 
     user = session['user']
     success, error = add_to_queue(queue_type, user['name'], user['email'])
@@ -522,21 +1013,16 @@ def api_add_to_queue():
 
 
 @app.route('/api/queue/remove', methods=['POST'])
+@require_admin
 def api_remove_from_queue():
     """Remove a user from specified queue (admin only)."""
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-
-    user_email = session['user']['email']
-    if not is_admin_user(user_email):
-        return jsonify({'error': 'Admin access required'}), 403
-
-    data = request.json
+    data = _json_body()
     queue_type = data.get('queue_type')
     email_to_remove = data.get('email')
 
-    if queue_type not in ['turtlebot', 'ur7e']:
-        return jsonify({'error': 'Invalid queue type'}), 400
+    error = _invalid_choice(data, 'queue_type')
+    if error:
+        return jsonify({'error': error}), 400
 
     if not email_to_remove:
         return jsonify({'error': 'Email is required'}), 400
@@ -551,28 +1037,24 @@ def api_remove_from_queue():
 
 
 @app.route('/api/queue/reorder', methods=['POST'])
+@require_admin
 def api_reorder_queue():
     """Move a queue entry up or down (admin only)."""
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-
-    user_email = session['user']['email']
-    if not is_admin_user(user_email):
-        return jsonify({'error': 'Admin access required'}), 403
-
-    data = request.json
+    data = _json_body()
     queue_type = data.get('queue_type')
     email = data.get('email')
     direction = data.get('direction')
 
-    if queue_type not in ['turtlebot', 'ur7e']:
-        return jsonify({'error': 'Invalid queue type'}), 400
+    error = _invalid_choice(data, 'queue_type')
+    if error:
+        return jsonify({'error': error}), 400
 
     if not email:
         return jsonify({'error': 'Email is required'}), 400
 
-    if direction not in ['up', 'down']:
-        return jsonify({'error': 'Invalid direction'}), 400
+    error = _invalid_choice(data, 'direction')
+    if error:
+        return jsonify({'error': error}), 400
 
     success, error = reorder_queue(queue_type, email, direction)
     if not success:
@@ -586,22 +1068,17 @@ def api_reorder_queue():
 
 
 @app.route('/api/queue/reposition', methods=['POST'])
+@require_admin
 def reposition_in_queue():
     """Move a queue entry to a specific position (admin only)."""
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-
-    user_email = session['user']['email']
-    if not is_admin_user(user_email):
-        return jsonify({'error': 'Admin access required'}), 403
-
-    data = request.json
+    data = _json_body()
     queue_type = data.get('queue_type')
     email = data.get('email')
     new_index = data.get('new_index')
 
-    if queue_type not in ['turtlebot', 'ur7e']:
-        return jsonify({'error': 'Invalid queue type'}), 400
+    error = _invalid_choice(data, 'queue_type')
+    if error:
+        return jsonify({'error': error}), 400
 
     if not email:
         return jsonify({'error': 'Email is required'}), 400
@@ -621,23 +1098,17 @@ def reposition_in_queue():
 
 
 @app.route('/api/station/override', methods=['POST'])
+@require_admin
 def api_set_station_override():
     """Set or clear a manual override for a station (admin only)."""
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-
-    user_email = session['user']['email']
-    if not is_admin_user(user_email):
-        return jsonify({'error': 'Admin access required'}), 403
-
-    data = request.json
+    data = _json_body()
     station = data.get('station')
     override_occupied = data.get('override_occupied')
 
     if station is None or not isinstance(station, int):
         return jsonify({'error': 'Valid station number is required'}), 400
 
-    if station not in TURTLEBOT_STATIONS and station not in UR7E_STATIONS:
+    if station not in STATION_TYPE:
         return jsonify({'error': 'Invalid station number'}), 400
 
     if override_occupied is not None and not isinstance(override_occupied, bool):
@@ -674,9 +1145,7 @@ def claim_page(token):
     if not claim:
         return render_template('claim.html', error='Invalid or expired claim link.')
 
-    # Calculate time remaining
-    expires_at = datetime.fromisoformat(claim['expires_at'])
-    time_remaining = (expires_at - datetime.now()).total_seconds()
+    time_remaining = claim['expires_at_ts'] - time.time()
 
     return render_template('claim.html',
                          claim=claim,
@@ -687,7 +1156,7 @@ def claim_page(token):
 @app.route('/api/claim/confirm', methods=['POST'])
 def confirm_claim():
     """Confirm claim - remove from queue."""
-    data = request.json
+    data = _json_body()
     token = data.get('token')
 
     if not token:
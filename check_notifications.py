@@ -5,13 +5,16 @@ Only does work during Lab OH times.
 """
 import os
 import smtplib
+import string
+import time
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import secrets
 
+import lab_utils
 from lab_utils import (
-    TURTLEBOT_STATIONS, UR7E_STATIONS,
+    TURTLEBOT_STATIONS, UR7E_STATIONS, STATION_TYPE,
     is_queue_active_time,
     # Data access layer
     get_station_states, get_first_in_queue, get_queue,
@@ -29,32 +32,111 @@ GMAIL_APP_PASSWORD = os.environ.get('GMAIL_APP_PASSWORD', '')
 CLAIM_EXPIRY_MINUTES = 5
 
 
-def has_pending_claim(station_type, claims):
-    """Check if there's already a pending claim for this station type."""
-    now = datetime.now()
+# Notification email bodies, parsed once; send_notification_email fills them in
+NOTIFICATION_HTML = string.Template("""
+    <html>
+    <body>
+        <h2>Station ${station} (${station_display}) is now available!</h2>
+        <p>Hi ${to_name},</p>
+        <p>You're first in the ${station_display} queue, and <strong>Station ${station}</strong> just became available.</p>
+        <p><strong>You have ${expiry_minutes} minutes to claim it!</strong></p>
+        <p><a href="${claim_url}" style="background-color: #4CAF50; color: white; padding: 14px 20px; text-decoration: none; border-radius: 4px; display: inline-block;">Claim Station ${station}</a></p>
+        <p>Or copy this link: ${claim_url}</p>
+        <p>If you don't claim within ${expiry_minutes} minutes, the next person in the queue will be notified.</p>
+        <p>Best,<br>EE106A Lab System</p>
+        <hr style="margin-top: 30px; border: none; border-top: 1px solid #ccc;">
+        <p style="color: #666; font-size: 0.9em;">Go Patriots, Go Celtics, Nobody is Illegal on Stolen Land, Love is Love, Black Lives Matter</p>
+    </body>
+    </html>
+    """)
 
-    for claim in claims:
-        if claim['station_type'] == station_type:
-            is_confirmed = claim.get('confirmed', '').lower() == 'true'
-            expires_at = datetime.fromisoformat(claim['expires_at'])
-            if is_confirmed or expires_at > now:
-                return True
+NOTIFICATION_TEXT = string.Template("""
+Station ${station} (${station_display}) is now available!
 
-    return False
+Hi ${to_name},
 
+You're first in the ${station_display} queue, and Station ${station} just became available.
 
-def person_has_active_claim(email, claims):
-    """Check if a person already has any active claim (to avoid spam)."""
-    now = datetime.now()
+You have ${expiry_minutes} minutes to claim it!
 
-    for claim in claims:
-        if claim['email'] == email:
-            is_confirmed = claim.get('confirmed', '').lower() == 'true'
-            expires_at = datetime.fromisoformat(claim['expires_at'])
-            if is_confirmed or expires_at > now:
-                return True
+Click here to claim: ${claim_url}
+
+If you don't claim within ${expiry_minutes} minutes, the next person in the queue will be notified.
+
+Best,
+EE106A Lab System
+
+---
+Go Patriots, Go Celtics, Nobody is Illegal on Stolen Land, Love is Love, Black Lives Matter
+    """)
+
+
+def _stat_key(path):
+    """``mtime_ns:size:inode`` of ``path``, or ``-`` if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return '-'
+    return f'{st.st_mtime_ns}:{st.st_size}:{st.st_ino}'
 
-    return False
+
+def _input_keys():
+    """Stat keys of the files other processes change (station status, overrides).
+
+    Taken before the tick reads them, so a change that lands mid-tick shows
+    up as a mismatch on the next tick.
+    """
+    return [_stat_key(lab_utils.STATION_STATUS_CSV_PATH),
+            _stat_key(lab_utils.MANUAL_OVERRIDES_CSV_PATH)]
+
+
+def _tick_fingerprint(input_keys):
+    """Fingerprint of everything a tick reads: the inputs plus the files it writes."""
+    return ' '.join(input_keys + [
+        _stat_key(lab_utils.PREVIOUS_STATES_PATH),
+        _stat_key(lab_utils.PENDING_CLAIMS_CSV_PATH),
+        _stat_key(lab_utils.QUEUE_TURTLEBOT_CSV_PATH),
+        _stat_key(lab_utils.QUEUE_UR7E_CSV_PATH),
+    ])
+
+
+def _read_fingerprint():
+    try:
+        with open(lab_utils.NOTIFY_FINGERPRINT_PATH, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _record_fingerprint(input_keys, active_claims):
+    """Remember this tick's files, so an identical next tick can be skipped.
+
+    Only recorded when no claims are left: claims expire with time, not on
+    a file change, so those ticks must always run.
+    """
+    try:
+        if active_claims:
+            os.remove(lab_utils.NOTIFY_FINGERPRINT_PATH)
+        else:
+            with open(lab_utils.NOTIFY_FINGERPRINT_PATH, 'w') as f:
+                f.write(_tick_fingerprint(input_keys))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error saving tick fingerprint: {e}")
+
+
+def _expires_at_ts(claim):
+    """Epoch seconds at which ``claim`` expires.
+
+    Parsed from the ISO ``expires_at`` once and kept on the claim as
+    ``expires_at_ts`` (as lab_utils.get_pending_claim does), so later scans
+    in the same tick compare floats instead of re-parsing.
+    """
+    ts = claim.get('expires_at_ts')
+    if ts is None:
+        ts = claim['expires_at_ts'] = datetime.fromisoformat(claim['expires_at']).timestamp()
+    return ts
 
 
 def create_pending_claim(email, name, station_type, station, claims):
@@ -72,14 +154,50 @@ def create_pending_claim(email, name, station_type, station, claims):
         'station': station,
         'claim_token': token,
         'expires_at': expires_at.isoformat(),
+        'expires_at_ts': expires_at.timestamp(),
         'confirmed': 'false'
     })
 
     return token
 
 
-def send_notification_email(to_email, to_name, station_type, station, claim_token):
-    """Send email via Gmail SMTP."""
+class SmtpSession:
+    """Gmail SMTP connection shared by the emails sent in one tick.
+
+    Connects and logs in on the first send, so a tick that notifies nobody
+    never connects; close() quits it.  A failed send drops the connection
+    and the next send reconnects.
+    """
+
+    def __init__(self):
+        self._server = None
+
+    def send(self, to_email, message):
+        if self._server is None:
+            server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
+            try:
+                server.login(GMAIL_SENDER, GMAIL_APP_PASSWORD)
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+        try:
+            self._server.sendmail(GMAIL_SENDER, to_email, message)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+
+def send_notification_email(to_email, to_name, station_type, station, claim_token, smtp=None):
+    """Send email via Gmail SMTP, over ``smtp`` (an SmtpSession) if given."""
     if not GMAIL_SENDER or not GMAIL_APP_PASSWORD:
         print(f"Email not configured. Would notify {to_email} about station {station}.")
         return False
@@ -89,42 +207,15 @@ def send_notification_email(to_email, to_name, station_type, station, claim_toke
 
     subject = f"[EE106A] Station {station} ({station_display}) Available - Claim Now!"
 
-    html_body = f"""
-    <html>
-    <body>
-        <h2>Station {station} ({station_display}) is now available!</h2>
-        <p>Hi {to_name},</p>
-        <p>You're first in the {station_display} queue, and <strong>Station {station}</strong> just became available.</p>
-        <p><strong>You have {CLAIM_EXPIRY_MINUTES} minutes to claim it!</strong></p>
-        <p><a href="{claim_url}" style="background-color: #4CAF50; color: white; padding: 14px 20px; text-decoration: none; border-radius: 4px; display: inline-block;">Claim Station {station}</a></p>
-        <p>Or copy this link: {claim_url}</p>
-        <p>If you don't claim within {CLAIM_EXPIRY_MINUTES} minutes, the next person in the queue will be notified.</p>
-        <p>Best,<br>EE106A Lab System</p>
-        <hr style="margin-top: 30px; border: none; border-top: 1px solid #ccc;">
-        <p style="color: #666; font-size: 0.9em;">Go Patriots, Go Celtics, Nobody is Illegal on Stolen Land, Love is Love, Black Lives Matter</p>
-    </body>
-    </html>
-    """
-
-    text_body = f"""
-Station {station} ({station_display}) is now available!
-
-Hi {to_name},
-
-You're first in the {station_display} queue, and Station {station} just became available.
-
-You have {CLAIM_EXPIRY_MINUTES} minutes to claim it!
-
-Click here to claim: {claim_url}
-
-If you don't claim within {CLAIM_EXPIRY_MINUTES} minutes, the next person in the queue will be notified.
-
-Best,
-EE106A Lab System
-
----
-Go Patriots, Go Celtics, Nobody is Illegal on Stolen Land, Love is Love, Black Lives Matter
-    """
+    fields = {
+        'station': station,
+        'station_display': station_display,
+        'to_name': to_name,
+        'claim_url': claim_url,
+        'expiry_minutes': CLAIM_EXPIRY_MINUTES,
+    }
+    html_body = NOTIFICATION_HTML.substitute(fields)
+    text_body = NOTIFICATION_TEXT.substitute(fields)
 
     msg = MIMEMultipart('alternative')
     msg['Subject'] = subject
@@ -134,30 +225,54 @@ Go Patriots, Go Celtics, Nobody is Illegal on Stolen Land, Love is Love, Black L
     msg.attach(MIMEText(text_body, 'plain'))
     msg.attach(MIMEText(html_body, 'html'))
 
+    session = smtp if smtp is not None else SmtpSession()
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(GMAIL_SENDER, GMAIL_APP_PASSWORD)
-            server.sendmail(GMAIL_SENDER, to_email, msg.as_string())
+        session.send(to_email, msg.as_bytes())
         print(f"Sent notification email to {to_email} for {station_type}")
         return True
     except Exception as e:
         print(f"Error sending email: {e}")
         return False
+    finally:
+        if smtp is None:
+            session.close()
+
+
+def _notify_first_in_queue(station_type, station, active_claims, active_index, smtp):
+    """Offer ``station`` to the head of the ``station_type`` queue.
+
+    ``active_index`` is the ``(station types, emails)`` pair of sets for
+    ``active_claims``; the new claim is added to both.
+    """
+    person = get_first_in_queue(station_type)
+    if not person:
+        return
+    active_types, active_emails = active_index
+    if person['email'] in active_emails:
+        print(f"Person {person['email']} already has an active claim, skipping")
+        return
+    token = create_pending_claim(person['email'], person['name'], station_type, station, active_claims)
+    active_types.add(station_type)
+    active_emails.add(person['email'])
+    send_notification_email(person['email'], person['name'], station_type, station, token, smtp=smtp)
 
 
-def check_expired_claims(claims, current_states):
+def check_expired_claims(claims, current_states, smtp=None, active_index=None):
     """Find and handle expired claims - notify next person in queue.
 
     Mutates *claims* in-place (removes expired, keeps active).
-    Returns the list of active claims.
+    Returns the list of active claims.  Emails go over ``smtp`` if given.
+    If ``active_index`` is given, it is a pair of empty sets that are
+    filled with the station types and emails of the active claims, so
+    callers can test for them without rescanning the list.
     """
-    now = datetime.now()
+    now = time.time()
     active_claims = []
+    active_types, active_emails = active_index if active_index is not None else (set(), set())
     expired_by_type = {}
 
     for claim in claims:
         is_confirmed = claim.get('confirmed', '').lower() == 'true'
-        expires_at = datetime.fromisoformat(claim['expires_at'])
         station = int(claim.get('station', 0)) if claim.get('station') else None
 
         # Check if station is now occupied (someone logged in)
@@ -168,12 +283,12 @@ def check_expired_claims(claims, current_states):
             print(f"Confirmed claim cleared - {claim['email']} logged into station {station}")
             continue  # Don't keep this claim
 
-        if is_confirmed:
-            # Confirmed claims stay active until station is occupied
-            active_claims.append(claim)
-        elif expires_at > now:
-            # Unconfirmed claim still has time
+        if is_confirmed or _expires_at_ts(claim) > now:
+            # Confirmed claims stay active until station is occupied;
+            # unconfirmed ones while they still have time
             active_claims.append(claim)
+            active_types.add(claim['station_type'])
+            active_emails.add(claim['email'])
         else:
             # Unconfirmed claim expired - track by station type
             station_type = claim['station_type']
@@ -182,8 +297,9 @@ def check_expired_claims(claims, current_states):
             expired_by_type[station_type].append(claim)
             print(f"Claim expired for {claim['email']} ({station_type})")
 
-    # Save only active claims
-    save_pending_claims(active_claims)
+    # Save only active claims (nothing to write if none were dropped)
+    if len(active_claims) != len(claims):
+        save_pending_claims(active_claims)
 
     # For each expired claim type, remove from queue and notify next person
     for station_type, expired_claims in expired_by_type.items():
@@ -192,8 +308,7 @@ def check_expired_claims(claims, current_states):
             remove_from_queue(station_type, claim['email'])
 
         # Only notify next if there isn't already an active claim for this type
-        has_active = any(c['station_type'] == station_type for c in active_claims)
-        if not has_active:
+        if station_type not in active_types:
             # Check if there are still stations available
             stations = TURTLEBOT_STATIONS if station_type == 'turtlebot' else UR7E_STATIONS
             # Find first available station of this type
@@ -205,13 +320,8 @@ def check_expired_claims(claims, current_states):
 
             if available_station:
                 # Notify next person in queue
-                person = get_first_in_queue(station_type)
-                if person:
-                    if person_has_active_claim(person['email'], active_claims):
-                        print(f"Person {person['email']} already has an active claim, skipping")
-                    else:
-                        token = create_pending_claim(person['email'], person['name'], station_type, available_station, active_claims)
-                        send_notification_email(person['email'], person['name'], station_type, available_station, token)
+                _notify_first_in_queue(station_type, available_station, active_claims,
+                                       (active_types, active_emails), smtp)
 
     return active_claims
 
@@ -237,43 +347,57 @@ def main():
                 save_pending_claims(confirmed)
         return
 
-    print(f"Running notification check at {datetime.now()}")
-
-    # Read all shared state once at the start
-    current = get_station_states()
-    previous = get_previous_states()
-    claims = get_all_pending_claims()
+    # In CSV mode, skip the tick when no file has changed since a tick that
+    # ended with no claims: it would read the same states and do nothing
+    input_keys = None
+    if lab_utils.DATA_SOURCE != 'database':
+        input_keys = _input_keys()
+        if _read_fingerprint() == _tick_fingerprint(input_keys):
+            return
 
-    # Check for expired claims first (mutates claims list)
-    active_claims = check_expired_claims(claims, current)
+    print(f"Running notification check at {datetime.now()}")
 
-    # On first run, just save states without notifications
-    if not previous:
-        print("First run - saving initial states")
-        save_states(current)
-        return
+    # Every email this tick shares one SMTP login
+    smtp = SmtpSession()
+    try:
+        # Read all shared state once at the start
+        current = get_station_states()
+        previous = get_previous_states()
+        claims = get_all_pending_claims()
 
-    # Detect freed stations (was occupied, now available)
-    for station, occupied in current.items():
-        prev_occupied = previous.get(station, occupied)
-        if prev_occupied and not occupied:
-            station_type = 'turtlebot' if station in TURTLEBOT_STATIONS else 'ur7e'
-            print(f"Station {station} ({station_type}) became available")
-
-            # Check no pending claim for this station type
-            if not has_pending_claim(station_type, active_claims):
-                person = get_first_in_queue(station_type)
-                if person:
-                    if person_has_active_claim(person['email'], active_claims):
-                        print(f"Person {person['email']} already has an active claim, skipping")
-                    else:
-                        token = create_pending_claim(person['email'], person['name'], station_type, station, active_claims)
-                        send_notification_email(person['email'], person['name'], station_type, station, token)
-            else:
-                print(f"Already have pending claim for {station_type}, skipping notification")
-
-    # Save states for next run
-    save_states(current)
+        # Check for expired claims first (mutates claims list).  The index
+        # sets answer "claim pending for this type / person?" in O(1).
+        active_index = (set(), set())
+        active_claims = check_expired_claims(claims, current, smtp, active_index)
+
+        # On first run, just save states without notifications
+        if not previous:
+            print("First run - saving initial states")
+            save_states(current)
+            if input_keys is not None:
+                _record_fingerprint(input_keys, active_claims)
+            return
+
+        # Detect freed stations (was occupied, now available)
+        for station, occupied in current.items():
+            prev_occupied = previous.get(station, occupied)
+            if prev_occupied and not occupied:
+                station_type = STATION_TYPE.get(station, 'ur7e')
+                print(f"Station {station} ({station_type}) became available")
+
+                # Check no pending claim for this station type
+                if station_type not in active_index[0]:
+                    _notify_first_in_queue(station_type, station, active_claims, active_index, smtp)
+                else:
+                    print(f"Already have pending claim for {station_type}, skipping notification")
+
+        # Save states for next run (unchanged states are already on disk)
+        if current != previous:
+            save_states(current)
+        if input_keys is not None:
+            _record_fingerprint(input_keys, active_claims)
+    finally:
+        smtp.close()
 
 
 if __name__ == '__main__':
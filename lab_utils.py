@@ -6,7 +6,7 @@ Consolidates duplicated logic across app.py, check_notifications.py, and update_
 - CSV/file path constants
 - Manual overrides reader
 - Advisory file locking for CSV safety
-- Database connection management
+- Database connection management (pooled)
 - Data access layer (CSV / DB dispatch via DATA_SOURCE)
 """
 import os
@@ -15,6 +15,12 @@ import time
 import fcntl
 import re
 import secrets
+import queue
+import io
+import threading
+import tempfile
+from operator import itemgetter
+from collections import namedtuple
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 
@@ -36,18 +42,100 @@ DB_CONFIG = {
     "user": os.environ.get("DB_USER", "ee106a"),
     "password": os.environ.get("DB_PASSWORD", ""),
     "database": os.environ.get("DB_NAME", "ee106a"),
+    # Bound every network wait so a stalled DB host can't pin a gunicorn
+    # thread indefinitely (pymysql's read/write default is no timeout)
+    "connect_timeout": 5,
+    "read_timeout": 10,
+    "write_timeout": 10,
 }
 
 
+# Idle connections kept per process.  gunicorn runs several workers, so this
+# stays small to keep well under the server's max_connections.
+_DB_POOL_MAX_IDLE = 8
+# Holds (connection, time.monotonic() when it was released)
+_db_pool = queue.LifoQueue(maxsize=_DB_POOL_MAX_IDLE)
+# Connections idle longer than this are pinged before reuse; fresher ones
+# are handed out directly, saving a round trip on back-to-back queries.
+_DB_POOL_PING_AFTER = 30  # seconds
+
+
+class _PooledConnection:
+    """Proxy around a pymysql connection whose ``close()`` returns it to the pool.
+
+    A proxy dropped without ``close()`` (e.g. an exception skipped the
+    close call) hands its connection back when it is garbage collected,
+    so error paths don't drain the pool.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            _release_db_connection(conn)
+
+    __del__ = close
+
+
+def _release_db_connection(conn):
+    try:
+        # End any open transaction so the next borrower neither inherits
+        # uncommitted writes nor reads a stale REPEATABLE READ snapshot.
+        conn.rollback()
+        _db_pool.put_nowait((conn, time.monotonic()))
+    except Exception:
+        # Pool full or connection broken - just drop it
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
 def get_db_connection():
-    """Return a new pymysql connection using shared DB_CONFIG."""
-    return pymysql.connect(**DB_CONFIG)
+    """Return a pooled pymysql connection using shared DB_CONFIG.
+
+    Idle connections are reused instead of paying a fresh TCP + auth
+    handshake on every call; ones idle for over _DB_POOL_PING_AFTER seconds
+    are pinged first.  ``close()`` on the returned object hands the
+    connection back to the pool.
+    """
+    while True:
+        try:
+            conn, released_at = _db_pool.get_nowait()
+        except queue.Empty:
+            break
+        if time.monotonic() - released_at < _DB_POOL_PING_AFTER:
+            return _PooledConnection(conn)
+        try:
+            conn.ping(reconnect=True)
+            return _PooledConnection(conn)
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    return _PooledConnection(pymysql.connect(**DB_CONFIG))
 
 # ---------------------------------------------------------------------------
 # Station groupings
 # ---------------------------------------------------------------------------
-TURTLEBOT_STATIONS = {1, 2, 3, 4, 5, 11}
-UR7E_STATIONS = {6, 7, 8, 9, 10}
+TURTLEBOT_STATIONS = frozenset({1, 2, 3, 4, 5, 11})
+UR7E_STATIONS = frozenset({6, 7, 8, 9, 10})
+
+# station number -> robot/queue type, for one-lookup classification
+STATION_TYPE = {n: 'turtlebot' for n in TURTLEBOT_STATIONS}
+STATION_TYPE.update({n: 'ur7e' for n in UR7E_STATIONS})
 
 # ---------------------------------------------------------------------------
 # Paths (absolute, based on this file's location)
@@ -60,18 +148,22 @@ MANUAL_OVERRIDES_CSV_PATH = os.path.join(BASE_DIR, 'csv', 'manual_overrides.csv'
 PENDING_CLAIMS_CSV_PATH = os.path.join(BASE_DIR, 'csv', 'pending_claims.csv')
 STATION_STATUS_CSV_PATH = os.path.join(BASE_DIR, 'csv', 'station_status.csv')
 PREVIOUS_STATES_PATH = os.path.join(BASE_DIR, 'csv', 'previous_states.json')
+NOTIFY_FINGERPRINT_PATH = os.path.join(BASE_DIR, 'csv', 'notify_fingerprint.txt')
+OVERRIDES_VERSION_PATH = os.path.join(BASE_DIR, 'csv', 'overrides_version.txt')
+QUEUES_VERSION_PATH = os.path.join(BASE_DIR, 'csv', 'queues_version.txt')
 LAST_UPDATE_FILE = os.path.join(BASE_DIR, 'csv', 'last_update.txt')
 CALENDAR_PATH = os.path.join(BASE_DIR, 'uploads', 'course_calendar.ics')
 ADMIN_USERS_FILE = os.path.join(BASE_DIR, 'admin_users.txt')
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+SVG_PATH = os.path.join(BASE_DIR, 'static', 'lab_room.svg')
+ABOUT_PATH = os.path.join(BASE_DIR, 'website_about.md')
 
 # ---------------------------------------------------------------------------
-# Pre-compiled regex patterns for SVG desk color replacement
+# Pre-compiled regex for SVG desk color replacement
 # ---------------------------------------------------------------------------
-DESK_REGEX = {
-    str(n): re.compile(rf'(<path id="desk-{n}"[^>]*fill=")[^"]*(")')
-    for n in list(TURTLEBOT_STATIONS | UR7E_STATIONS)
-}
+# Matches any desk path, so one pass over the SVG finds every desk;
+# groups: (prefix up to fill=", station number, closing ")
+DESK_PATTERN = re.compile(r'(<path id="desk-(\d+)"[^>]*fill=")[^"]*(")')
 
 # ---------------------------------------------------------------------------
 # Advisory file locking
@@ -95,6 +187,46 @@ def file_lock(path):
         lock_fd.close()
 
 
+def replace_file(path, text, lock=False):
+    """Atomically replace the contents of ``path`` with ``text``.
+
+    The text goes to a temp file in the same directory, which is then
+    renamed over ``path``, so readers see either the old file or the new
+    one, and the data is fsynced first so a crash can't leave it truncated.
+    The original file's permissions are kept.
+
+    Read-modify-write callers hold ``file_lock(path)`` around the whole
+    update.  Callers that overwrite without reading pass ``lock=True``
+    instead, so the lock is only held for the rename, not the write.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o644
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'w', newline='') as f:
+            f.write(text)
+            # Flush to disk before the rename, or a crash could leave the
+            # new name pointing at an empty file
+            f.flush()
+            os.fsync(f.fileno())
+        if lock:
+            with file_lock(path):
+                os.replace(tmp_path, path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 # ---------------------------------------------------------------------------
 # Calendar event parsing – cached
 # ---------------------------------------------------------------------------
@@ -274,6 +406,9 @@ def is_queue_active_time():
 # Internal helpers
 # ---------------------------------------------------------------------------
 
+QUEUE_TYPES = ('turtlebot', 'ur7e')
+
+
 def _queue_csv_path(queue_type):
     """Return the CSV path for the given queue type."""
     return QUEUE_TURTLEBOT_CSV_PATH if queue_type == 'turtlebot' else QUEUE_UR7E_CSV_PATH
@@ -282,6 +417,102 @@ PENDING_CLAIMS_FIELDS = ['email', 'name', 'station_type', 'station',
                          'claim_token', 'expires_at', 'confirmed']
 
 
+def iter_csv_columns(f, *columns):
+    """Yield tuples of the named columns from an open CSV file.
+
+    Column positions are looked up once from the header row, so rows are
+    read positionally instead of building a dict per row like
+    ``csv.DictReader``.  Blank and short rows are skipped; a missing column
+    raises ``ValueError``.
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    indices = [header.index(column) for column in columns]
+    get = itemgetter(*indices)
+    width = max(indices) + 1
+    for row in reader:
+        if len(row) >= width:
+            yield get(row)
+
+
+# Parsed files: {path: ((mtime_ns, size, inode), value)}, see load_cached()
+_file_cache = {}
+_file_cache_lock = threading.Lock()
+
+
+def load_cached(path, parser, default=None):
+    """Return ``parser(f)`` for the file at ``path``, reparsing only when it changes.
+
+    Results are cached on the file's (mtime_ns, size, inode), so a repeat
+    call costs one stat; the inode catches a same-size file swapped in by
+    os.replace.  A missing file gives ``default``.  Reparses are serialized,
+    so concurrent requests that see the same change parse it once.  Parser
+    errors propagate and nothing is cached.  Parsers should return values
+    callers won't mutate (tuples, frozensets) or callers must copy.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return default
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with _file_cache_lock:
+        # Another thread may have reparsed while this one waited
+        cached = _file_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            with open(path, 'r', newline='') as f:
+                value = parser(f)
+        except FileNotFoundError:
+            return default
+        _file_cache[path] = (key, value)
+    return value
+
+
+def invalidate_cached(path):
+    """Drop ``path`` from the load_cached() cache (call after writing it)."""
+    _file_cache.pop(path, None)
+
+
+# Characters that force csv's minimal quoting
+_CSV_SPECIAL = frozenset(',"\r\n')
+
+
+def _csv_line(*values):
+    """Format one CSV row of strings exactly as ``csv.writer`` would.
+
+    Plain values are joined directly; the csv module is only used when a
+    value needs quoting.  None is written as an empty field.
+    """
+    values = ['' if value is None else value for value in values]
+    if any(_CSV_SPECIAL.intersection(value) for value in values):
+        buf = io.StringIO()
+        csv.writer(buf).writerow(values)
+        return buf.getvalue()
+    return ','.join(values) + '\r\n'
+
+
+def append_csv_line(path, header, line):
+    """Append one formatted CSV row to ``path``, writing ``header`` first if it's empty.
+
+    One O_APPEND write(2) lands the whole row at the end of the file, so a
+    reader never sees half of it.  Call with the file's lock held.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size == 0:
+            line = header + line
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
 # ---------------------------------------------------------------------------
 # Manual overrides
 # ---------------------------------------------------------------------------
@@ -292,22 +523,25 @@ def get_manual_overrides():
     return _get_manual_overrides_csv()
 
 
-def _get_manual_overrides_csv():
+def _parse_overrides_csv(f):
     overrides = {}
-    if os.path.exists(MANUAL_OVERRIDES_CSV_PATH):
-        try:
-            with open(MANUAL_OVERRIDES_CSV_PATH, 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    station = int(row['station'])
-                    val = row['override_occupied'].lower()
-                    if val in ('true', 'false'):
-                        overrides[station] = (val == 'true')
-        except Exception as e:
-            print(f"Error reading manual overrides: {e}")
+    for station, val in iter_csv_columns(f, 'station', 'override_occupied'):
+        val = val.lower()
+        if val in ('true', 'false'):
+            overrides[int(station)] = (val == 'true')
     return overrides
 
 
+def _get_manual_overrides_csv():
+    try:
+        overrides = load_cached(MANUAL_OVERRIDES_CSV_PATH, _parse_overrides_csv, {})
+    except Exception as e:
+        print(f"Error reading manual overrides: {e}")
+        return {}
+    # Copied so callers can't mutate the cached dict
+    return dict(overrides)
+
+
 def _get_manual_overrides_db():
     overrides = {}
     try:
@@ -334,8 +568,54 @@ def set_manual_override(station, override_occupied):
         (success: bool, message: str)
     """
     if DATA_SOURCE == 'database':
-        return _set_manual_override_db(station, override_occupied)
-    return _set_manual_override_csv(station, override_occupied)
+        result = _set_manual_override_db(station, override_occupied)
+    else:
+        result = _set_manual_override_csv(station, override_occupied)
+    if result[0]:
+        _bump_version(OVERRIDES_VERSION_PATH)
+    return result
+
+
+def _file_version(path):
+    """Return the mtime (ns) of a version file, or 0 if it is absent."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _bump_version(path):
+    """Set a version file's mtime to now (creating it if needed).
+
+    Called after the write it announces has landed, so a failure here is
+    only logged: other workers then pick the change up when their TTL
+    expires.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a'):
+            pass
+        # An explicit ns timestamp, so back-to-back bumps differ even on
+        # filesystems with coarse mtime granularity
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+    except OSError as e:
+        print(f"Error updating {os.path.basename(path)}: {e}")
+
+
+def overrides_version():
+    """Version of the manual overrides, bumped by set_manual_override().
+
+    Web workers cache station rows and the /api/lab-data body for a short
+    TTL; comparing this (one stat) tells them their copy predates an
+    override made through any worker.
+    """
+    return _file_version(OVERRIDES_VERSION_PATH)
+
+
+def queues_version():
+    """Version of the queues, bumped by every successful queue write."""
+    return _file_version(QUEUES_VERSION_PATH)
 
 
 def _set_manual_override_csv(station, override_occupied):
@@ -344,9 +624,8 @@ def _set_manual_override_csv(station, override_occupied):
             overrides = {}
             if os.path.exists(MANUAL_OVERRIDES_CSV_PATH):
                 with open(MANUAL_OVERRIDES_CSV_PATH, 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        overrides[int(row['station'])] = row['override_occupied']
+                    for s, occupied in iter_csv_columns(f, 'station', 'override_occupied'):
+                        overrides[int(s)] = occupied
 
             if override_occupied is None:
                 if station in overrides:
@@ -358,11 +637,9 @@ def _set_manual_override_csv(station, override_occupied):
                 overrides[station] = 'true' if override_occupied else 'false'
                 message = f'Set station {station} override to {"occupied" if override_occupied else "available"}'
 
-            with open(MANUAL_OVERRIDES_CSV_PATH, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['station', 'override_occupied'])
-                writer.writeheader()
-                for s, occupied in sorted(overrides.items()):
-                    writer.writerow({'station': s, 'override_occupied': occupied})
+            replace_file(MANUAL_OVERRIDES_CSV_PATH, _csv_line('station', 'override_occupied') + ''.join(
+                _csv_line(str(s), occupied) for s, occupied in sorted(overrides.items())))
+            invalidate_cached(MANUAL_OVERRIDES_CSV_PATH)
 
         return True, message
     except Exception as e:
@@ -405,17 +682,48 @@ def get_queue(queue_type):
     return _get_queue_csv(queue_type)
 
 
+_QUEUE_HEADER = _csv_line('name', 'email')
+
+
+def _parse_queue_csv(f):
+    rows = tuple(iter_csv_columns(f, 'name', 'email'))
+    positions = {}
+    for i, (_, email) in enumerate(rows):
+        positions.setdefault(email, i)
+    return rows, positions
+
+
+def _load_queue_csv(csv_path):
+    """Return ``(rows, positions)`` for a queue CSV, or None if it doesn't exist.
+
+    ``rows`` is a tuple of (name, email); ``positions`` maps each email to
+    its row index, so membership checks and lookups skip scanning the rows.
+    Treat both as read-only: they are shared through the file cache.
+    """
+    return load_cached(csv_path, _parse_queue_csv)
+
+
+def _in_queue_csv(csv_path, email):
+    """True if ``email`` may be in the queue file (index lookup, no lock).
+
+    A False answer lets writers bail out before taking the file lock; a
+    True answer is re-checked under the lock.
+    """
+    loaded = _load_queue_csv(csv_path)
+    return loaded is not None and email in loaded[1]
+
+
 def _get_queue_csv(queue_type):
-    csv_path = _queue_csv_path(queue_type)
-    entries = []
-    try:
-        with open(csv_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                entries.append({'name': row['name'], 'email': row['email']})
-    except FileNotFoundError:
-        pass
-    return entries
+    loaded = _load_queue_csv(_queue_csv_path(queue_type))
+    if loaded is None:
+        return []
+    # Callers get fresh dicts, so the cached rows can't be mutated
+    return [{'name': name, 'email': email} for name, email in loaded[0]]
+
+
+def _write_queue_rows(csv_path, rows):
+    """Rewrite a queue CSV from (name, email) rows."""
+    replace_file(csv_path, _QUEUE_HEADER + ''.join(_csv_line(name, email) for name, email in rows))
 
 
 def _get_queue_db(queue_type):
@@ -435,6 +743,39 @@ def _get_queue_db(queue_type):
     return entries
 
 
+def get_all_queues():
+    """Return {'turtlebot': [...], 'ur7e': [...]} ordered entries for both queues.
+
+    In DB mode both queues come back from a single query.
+    """
+    if DATA_SOURCE == 'database':
+        return _get_all_queues_db()
+    return {queue_type: _get_queue_csv(queue_type) for queue_type in QUEUE_TYPES}
+
+
+def _get_all_queues_db():
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        queues = _fetch_all_queues_db(cursor)
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print(f"Error reading queues from DB: {e}")
+        queues = {queue_type: [] for queue_type in QUEUE_TYPES}
+    return queues
+
+
+def _fetch_all_queues_db(cursor):
+    queues = {queue_type: [] for queue_type in QUEUE_TYPES}
+    cursor.execute(
+        "SELECT queue_type, name, email FROM queues ORDER BY queue_type, position")
+    for queue_type, name, email in cursor.fetchall():
+        if queue_type in queues:
+            queues[queue_type].append({'name': name, 'email': email})
+    return queues
+
+
 def get_first_in_queue(queue_type):
     """Return first person in queue or None."""
     if DATA_SOURCE == 'database':
@@ -443,17 +784,17 @@ def get_first_in_queue(queue_type):
 
 
 def _get_first_in_queue_csv(queue_type):
-    csv_path = _queue_csv_path(queue_type)
-    if not os.path.exists(csv_path):
-        return None
+    # Shares the parsed queue with get_queue() and the queue writers, so
+    # repeat calls in one notifier tick cost a stat each
     try:
-        with open(csv_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                return {'name': row['name'], 'email': row['email']}
+        loaded = _load_queue_csv(_queue_csv_path(queue_type))
     except Exception as e:
         print(f"Error reading queue: {e}")
-    return None
+        return None
+    if not loaded or not loaded[0]:
+        return None
+    name, email = loaded[0][0]
+    return {'name': name, 'email': email}
 
 
 def _get_first_in_queue_db(queue_type):
@@ -480,30 +821,28 @@ def add_to_queue(queue_type, name, email):
         (success: bool, error_msg: str | None)
     """
     if DATA_SOURCE == 'database':
-        return _add_to_queue_db(queue_type, name, email)
-    return _add_to_queue_csv(queue_type, name, email)
+        result = _add_to_queue_db(queue_type, name, email)
+    else:
+        result = _add_to_queue_csv(queue_type, name, email)
+    if result[0]:
+        _bump_version(QUEUES_VERSION_PATH)
+    return result
 
 
 def _add_to_queue_csv(queue_type, name, email):
     csv_path = _queue_csv_path(queue_type)
     try:
         with file_lock(csv_path):
-            existing = []
-            if os.path.exists(csv_path):
-                with open(csv_path, 'r') as f:
-                    reader = csv.DictReader(f)
-                    existing = list(reader)
-                for entry in existing:
-                    if entry['email'] == email:
-                        return False, 'You are already in this queue'
-            else:
+            # Re-stat'ed under the lock, so the email index is current
+            loaded = _load_queue_csv(csv_path)
+            if loaded is not None and email in loaded[1]:
+                return False, 'You are already in this queue'
+            if loaded is None:
                 os.makedirs(os.path.dirname(csv_path), exist_ok=True)
 
-            with open(csv_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['name', 'email'])
-                writer.writeheader()
-                writer.writerows(existing)
-                writer.writerow({'name': name, 'email': email})
+            # Append just the new row instead of rewriting the file
+            append_csv_line(csv_path, _QUEUE_HEADER, _csv_line(name, email))
+            invalidate_cached(csv_path)
         return True, None
     except Exception as e:
         return False, f'Error adding to queue: {e}'
@@ -534,27 +873,26 @@ def _add_to_queue_db(queue_type, name, email):
 def remove_from_queue(queue_type, email):
     """Remove a person from the queue by email. Returns True if removed."""
     if DATA_SOURCE == 'database':
-        return _remove_from_queue_db(queue_type, email)
-    return _remove_from_queue_csv(queue_type, email)
+        result = _remove_from_queue_db(queue_type, email)
+    else:
+        result = _remove_from_queue_csv(queue_type, email)
+    if result:
+        _bump_version(QUEUES_VERSION_PATH)
+    return result
 
 
 def _remove_from_queue_csv(queue_type, email):
     csv_path = _queue_csv_path(queue_type)
-    if not os.path.exists(csv_path):
-        return False
     try:
+        if not _in_queue_csv(csv_path, email):
+            return False
         with file_lock(csv_path):
-            with open(csv_path, 'r') as f:
-                reader = csv.DictReader(f)
-                entries = list(reader)
-            original_count = len(entries)
-            entries = [e for e in entries if e['email'] != email]
-            if len(entries) == original_count:
+            # Re-stat'ed under the lock, so the index is current
+            loaded = _load_queue_csv(csv_path)
+            if loaded is None or email not in loaded[1]:
                 return False
-            with open(csv_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['name', 'email'])
-                writer.writeheader()
-                writer.writerows(entries)
+            _write_queue_rows(csv_path, [e for e in loaded[0] if e[1] != email])
+            invalidate_cached(csv_path)
         return True
     except Exception as e:
         print(f"Error removing from queue: {e}")
@@ -598,8 +936,12 @@ def reorder_queue(queue_type, email, direction):
         (success: bool, error_msg: str | None)
     """
     if DATA_SOURCE == 'database':
-        return _reorder_queue_db(queue_type, email, direction)
-    return _reorder_queue_csv(queue_type, email, direction)
+        result = _reorder_queue_db(queue_type, email, direction)
+    else:
+        result = _reorder_queue_csv(queue_type, email, direction)
+    if result[0]:
+        _bump_version(QUEUES_VERSION_PATH)
+    return result
 
 
 def _reorder_queue_csv(queue_type, email, direction):
@@ -607,19 +949,14 @@ def _reorder_queue_csv(queue_type, email, direction):
     if not os.path.exists(csv_path):
         return False, 'Queue does not exist'
     try:
+        if not _in_queue_csv(csv_path, email):
+            return False, 'User not found in queue'
         with file_lock(csv_path):
-            with open(csv_path, 'r') as f:
-                reader = csv.DictReader(f)
-                entries = list(reader)
-
-            index = None
-            for i, entry in enumerate(entries):
-                if entry['email'] == email:
-                    index = i
-                    break
-
+            loaded = _load_queue_csv(csv_path)
+            index = loaded[1].get(email) if loaded is not None else None
             if index is None:
                 return False, 'User not found in queue'
+            entries = list(loaded[0])
 
             if direction == 'up':
                 if index == 0:
@@ -630,10 +967,8 @@ def _reorder_queue_csv(queue_type, email, direction):
                     return False, 'Already at the bottom of the queue'
                 entries[index], entries[index + 1] = entries[index + 1], entries[index]
 
-            with open(csv_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['name', 'email'])
-                writer.writeheader()
-                writer.writerows(entries)
+            _write_queue_rows(csv_path, entries)
+            invalidate_cached(csv_path)
         return True, None
     except Exception as e:
         return False, f'Error updating queue: {e}'
@@ -687,17 +1022,20 @@ def _reorder_queue_db(queue_type, email, direction):
 def clear_queue(queue_type):
     """Clear all entries from a queue. Returns True on success."""
     if DATA_SOURCE == 'database':
-        return _clear_queue_db(queue_type)
-    return _clear_queue_csv(queue_type)
+        result = _clear_queue_db(queue_type)
+    else:
+        result = _clear_queue_csv(queue_type)
+    if result:
+        _bump_version(QUEUES_VERSION_PATH)
+    return result
 
 
 def _clear_queue_csv(queue_type):
     csv_path = _queue_csv_path(queue_type)
     try:
         with file_lock(csv_path):
-            with open(csv_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['name', 'email'])
-                writer.writeheader()
+            _write_queue_rows(csv_path, ())
+            invalidate_cached(csv_path)
         return True
     except Exception as e:
         print(f"Error clearing queue: {e}")
@@ -731,8 +1069,12 @@ def reposition_queue(queue_type, email, new_index):
         (success: bool, error_msg: str | None)
     """
     if DATA_SOURCE == 'database':
-        return _reposition_queue_db(queue_type, email, new_index)
-    return _reposition_queue_csv(queue_type, email, new_index)
+        result = _reposition_queue_db(queue_type, email, new_index)
+    else:
+        result = _reposition_queue_csv(queue_type, email, new_index)
+    if result[0]:
+        _bump_version(QUEUES_VERSION_PATH)
+    return result
 
 
 def _reposition_queue_csv(queue_type, email, new_index):
@@ -740,21 +1082,15 @@ def _reposition_queue_csv(queue_type, email, new_index):
     if not os.path.exists(csv_path):
         return False, 'Queue does not exist'
     try:
+        if not _in_queue_csv(csv_path, email):
+            return False, 'User not found in queue'
         with file_lock(csv_path):
-            with open(csv_path, 'r') as f:
-                reader = csv.DictReader(f)
-                entries = list(reader)
-
-            old_index = None
-            entry_to_move = None
-            for i, entry in enumerate(entries):
-                if entry['email'] == email:
-                    old_index = i
-                    entry_to_move = entry
-                    break
-
+            loaded = _load_queue_csv(csv_path)
+            old_index = loaded[1].get(email) if loaded is not None else None
             if old_index is None:
                 return False, 'User not found in queue'
+            entries = list(loaded[0])
+            entry_to_move = entries[old_index]
 
             if new_index >= len(entries):
                 new_index = len(entries) - 1
@@ -762,10 +1098,8 @@ def _reposition_queue_csv(queue_type, email, new_index):
             entries.pop(old_index)
             entries.insert(new_index, entry_to_move)
 
-            with open(csv_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['name', 'email'])
-                writer.writeheader()
-                writer.writerows(entries)
+            _write_queue_rows(csv_path, entries)
+            invalidate_cached(csv_path)
         return True, None
     except Exception as e:
         return False, f'Error updating queue: {e}'
@@ -822,24 +1156,32 @@ def get_claimed_stations():
     return _get_claimed_stations_csv()
 
 
+_CLAIMED_STATION_COLUMNS = frozenset(('station', 'name', 'expires_at', 'confirmed'))
+
+
 def _get_claimed_stations_csv():
     claimed = {}
     if not os.path.exists(PENDING_CLAIMS_CSV_PATH):
         return claimed
     try:
-        with open(PENDING_CLAIMS_CSV_PATH, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if 'station' not in row or not row['station']:
+        now = datetime.now()
+        with open(PENDING_CLAIMS_CSV_PATH, 'r', newline='') as f:
+            # Files from before the station column hold no station claims
+            header = next(csv.reader(f), None)
+            if header is None or not _CLAIMED_STATION_COLUMNS.issubset(header):
+                return claimed
+            f.seek(0)
+            rows = iter_csv_columns(f, 'station', 'name', 'expires_at', 'confirmed')
+            for station, name, expires_str, confirmed in rows:
+                if not station:
                     continue
-                is_confirmed = row.get('confirmed', '').lower() == 'true'
-                expires_at = datetime.fromisoformat(row['expires_at'])
-                if is_confirmed or expires_at > datetime.now():
-                    station = int(row['station'])
-                    time_remaining = int((expires_at - datetime.now()).total_seconds())
-                    claimed[station] = {
-                        'name': row['name'],
-                        'expires_at': row['expires_at'],
+                is_confirmed = confirmed[:1] in ('t', 'T')
+                expires_at = datetime.fromisoformat(expires_str)
+                if is_confirmed or expires_at > now:
+                    time_remaining = int((expires_at - now).total_seconds())
+                    claimed[int(station)] = {
+                        'name': name,
+                        'expires_at': expires_str,
                         'time_remaining': max(0, time_remaining),
                         'confirmed': is_confirmed
                     }
@@ -849,32 +1191,76 @@ def _get_claimed_stations_csv():
 
 
 def _get_claimed_stations_db():
-    claimed = {}
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            "SELECT station, name, expires_at, confirmed FROM pending_claims")
-        now = datetime.now()
-        for station, name, expires_at, confirmed in cursor.fetchall():
-            is_confirmed = bool(confirmed)
-            if is_confirmed or expires_at > now:
-                time_remaining = int((expires_at - now).total_seconds())
-                claimed[int(station)] = {
-                    'name': name,
-                    'expires_at': expires_at.isoformat(),
-                    'time_remaining': max(0, time_remaining),
-                    'confirmed': is_confirmed
-                }
+        claimed = _fetch_claimed_stations_db(cursor)
         cursor.close()
         conn.close()
     except Exception as e:
         print(f"Error reading pending claims from DB: {e}")
+        claimed = {}
     return claimed
 
 
+def _fetch_claimed_stations_db(cursor):
+    claimed = {}
+    cursor.execute(
+        "SELECT station, name, expires_at, confirmed FROM pending_claims")
+    now = datetime.now()
+    for station, name, expires_at, confirmed in cursor.fetchall():
+        is_confirmed = bool(confirmed)
+        if is_confirmed or expires_at > now:
+            time_remaining = int((expires_at - now).total_seconds())
+            claimed[int(station)] = {
+                'name': name,
+                'expires_at': expires_at.isoformat(),
+                'time_remaining': max(0, time_remaining),
+                'confirmed': is_confirmed
+            }
+    return claimed
+
+
+# ---------------------------------------------------------------------------
+# Page bundle: everything a status page reads besides station rows
+# ---------------------------------------------------------------------------
+PageBundle = namedtuple('PageBundle', ['queues', 'claimed_stations'])
+
+
+def get_page_bundle():
+    """Return PageBundle(queues, claimed_stations) for rendering a status page.
+
+    ``queues`` is as returned by get_all_queues() and ``claimed_stations``
+    as by get_claimed_stations().  In DB mode both are read over one pooled
+    connection instead of borrowing (and pinging) one per accessor.
+    """
+    if DATA_SOURCE == 'database':
+        return _get_page_bundle_db()
+    return PageBundle(get_all_queues(), _get_claimed_stations_csv())
+
+
+def _get_page_bundle_db():
+    queues = {queue_type: [] for queue_type in QUEUE_TYPES}
+    claimed = {}
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        queues = _fetch_all_queues_db(cursor)
+        claimed = _fetch_claimed_stations_db(cursor)
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print(f"Error reading page data from DB: {e}")
+    return PageBundle(queues, claimed)
+
+
 def get_pending_claim(token):
-    """Get a pending claim by token, or None if not found / expired."""
+    """Get a pending claim by token, or None if not found / expired.
+
+    Besides the stored fields, the claim carries ``expires_at_ts``: the
+    expiry as Unix epoch seconds, from the datetime already parsed for the
+    expiry check, so callers needn't parse ``expires_at`` again.
+    """
     if DATA_SOURCE == 'database':
         return _get_pending_claim_db(token)
     return _get_pending_claim_csv(token)
@@ -890,6 +1276,7 @@ def _get_pending_claim_csv(token):
                 if row['claim_token'] == token:
                     expires_at = datetime.fromisoformat(row['expires_at'])
                     if expires_at > datetime.now():
+                        row['expires_at_ts'] = expires_at.timestamp()
                         return row
                     return None
     except Exception as e:
@@ -919,6 +1306,7 @@ def _get_pending_claim_db(token):
             'station': str(station),
             'claim_token': claim_token,
             'expires_at': expires_at.isoformat(),
+            'expires_at_ts': expires_at.timestamp(),
             'confirmed': 'true' if confirmed else 'false',
         }
     except Exception as e:
@@ -980,32 +1368,46 @@ def create_pending_claim(email, name, station_type, station, token, expires_at):
 
 
 def _create_pending_claim_csv(email, name, station_type, station, token, expires_at):
+    expires_at = expires_at.isoformat() if isinstance(expires_at, datetime) else expires_at
     try:
         with file_lock(PENDING_CLAIMS_CSV_PATH):
-            claims = []
-            if os.path.exists(PENDING_CLAIMS_CSV_PATH):
-                with open(PENDING_CLAIMS_CSV_PATH, 'r') as f:
-                    reader = csv.DictReader(f)
-                    claims = list(reader)
-            claims.append({
-                'email': email,
-                'name': name,
-                'station_type': station_type,
-                'station': station,
-                'claim_token': token,
-                'expires_at': expires_at.isoformat() if isinstance(expires_at, datetime) else expires_at,
-                'confirmed': 'false',
-            })
-            with open(PENDING_CLAIMS_CSV_PATH, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=PENDING_CLAIMS_FIELDS)
-                writer.writeheader()
-                writer.writerows(claims)
+            try:
+                with open(PENDING_CLAIMS_CSV_PATH, 'r', newline='') as f:
+                    header = next(csv.reader(f), None)
+            except FileNotFoundError:
+                header = None
+            if header is None or header == PENDING_CLAIMS_FIELDS:
+                # Rows are written in PENDING_CLAIMS_FIELDS order, so the new
+                # claim can be appended instead of rewriting every claim
+                append_csv_line(PENDING_CLAIMS_CSV_PATH, _csv_line(*PENDING_CLAIMS_FIELDS), _csv_line(
+                    email, name, station_type, str(station), token, expires_at, 'false'))
+            else:
+                # A file with another header (e.g. from before the station and
+                # confirmed columns) is rewritten with the current one
+                with open(PENDING_CLAIMS_CSV_PATH, 'r', newline='') as f:
+                    claims = list(csv.DictReader(f))
+                claims.append({
+                    'email': email, 'name': name, 'station_type': station_type,
+                    'station': str(station), 'claim_token': token,
+                    'expires_at': expires_at, 'confirmed': 'false',
+                })
+                replace_file(PENDING_CLAIMS_CSV_PATH, _pending_claims_csv_text(claims))
         return True
     except Exception as e:
         print(f"Error creating pending claim: {e}")
         return False
 
 
+def _pending_claims_csv_text(claims):
+    """The pending claims CSV for a list of claim dicts."""
+    buf = io.StringIO()
+    # Claims may carry derived fields (expires_at_ts) that aren't stored
+    writer = csv.DictWriter(buf, fieldnames=PENDING_CLAIMS_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(claims)
+    return buf.getvalue()
+
+
 def _create_pending_claim_db(email, name, station_type, station, token, expires_at):
     try:
         conn = get_db_connection()
@@ -1039,10 +1441,7 @@ def _delete_pending_claim_csv(token):
             with open(PENDING_CLAIMS_CSV_PATH, 'r') as f:
                 reader = csv.DictReader(f)
                 claims = [row for row in reader if row['claim_token'] != token]
-            with open(PENDING_CLAIMS_CSV_PATH, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=PENDING_CLAIMS_FIELDS)
-                writer.writeheader()
-                writer.writerows(claims)
+            replace_file(PENDING_CLAIMS_CSV_PATH, _pending_claims_csv_text(claims))
         return True
     except Exception as e:
         print(f"Error deleting pending claim: {e}")
@@ -1082,10 +1481,7 @@ def _mark_claim_confirmed_csv(token):
             for claim in claims:
                 if claim['claim_token'] == token:
                     claim['confirmed'] = 'true'
-            with open(PENDING_CLAIMS_CSV_PATH, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=PENDING_CLAIMS_FIELDS)
-                writer.writeheader()
-                writer.writerows(claims)
+            replace_file(PENDING_CLAIMS_CSV_PATH, _pending_claims_csv_text(claims))
         return True
     except Exception as e:
         print(f"Error marking claim confirmed: {e}")
@@ -1118,11 +1514,8 @@ def save_pending_claims(claims):
 
 def _save_pending_claims_csv(claims):
     try:
-        with file_lock(PENDING_CLAIMS_CSV_PATH):
-            with open(PENDING_CLAIMS_CSV_PATH, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=PENDING_CLAIMS_FIELDS)
-                writer.writeheader()
-                writer.writerows(claims)
+        # Overwrites without reading, so only the rename needs the lock
+        replace_file(PENDING_CLAIMS_CSV_PATH, _pending_claims_csv_text(claims), lock=True)
     except Exception as e:
         print(f"Error saving pending claims: {e}")
 
@@ -1161,17 +1554,27 @@ def get_station_states():
     return _get_station_states_csv()
 
 
+# The spellings station checkers write, looked up without normalizing;
+# anything else falls back to the stripped, case-folded comparison
+_OCCUPIED_VALUES = {'true': True, 'false': False, 'True': True, 'False': False,
+                    '1': True, '0': False}
+
+
+def _parse_occupied(value):
+    occupied = _OCCUPIED_VALUES.get(value)
+    if occupied is None:
+        occupied = value.strip().lower() in ('true', '1', 'yes')
+    return occupied
+
+
 def _get_station_states_csv():
     states = {}
     if not os.path.exists(STATION_STATUS_CSV_PATH):
         return states
     try:
-        with open(STATION_STATUS_CSV_PATH, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                station = int(row['station'])
-                occ_val = row['occupied'].lower().strip()
-                states[station] = occ_val in ('true', '1', 'yes')
+        with open(STATION_STATUS_CSV_PATH, 'r', newline='') as f:
+            for station, occupied in iter_csv_columns(f, 'station', 'occupied'):
+                states[int(station)] = _parse_occupied(occupied)
     except Exception as e:
         print(f"Error reading station status: {e}")
     overrides = get_manual_overrides()
@@ -1271,7 +1674,6 @@ def save_states(states):
     """Save current states for next comparison (CSV mode only)."""
     import json
     try:
-        with open(PREVIOUS_STATES_PATH, 'w') as f:
-            json.dump(states, f)
+        replace_file(PREVIOUS_STATES_PATH, json.dumps(states))
     except Exception as e:
         print(f"Error saving states: {e}")
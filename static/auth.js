@@ -145,7 +145,7 @@ function closeSignInModal() {
 }
 
 // ---------------------------------------------------------------------------
-// Auto-refresh (polls /api/lab-data every 10 s)
+// Auto-refresh (polls /api/lab-data every 10 s; unchanged polls get a 304)
 // ---------------------------------------------------------------------------
 
 // Track queue visibility state for change detection
@@ -189,10 +189,11 @@ async function refreshLabData() {
                 ' UR7e' + (data.status.ur7es_available !== 1 ? 's' : '') + ' Open';
         }
 
-        // Refresh SVG (cache-buster forces re-fetch; server responds quickly due to cache)
+        // Refresh SVG only when the desk colors changed
         const svgImg = document.getElementById('lab-svg');
-        if (svgImg) {
-            svgImg.src = '/lab_room.svg?' + Date.now();
+        if (svgImg && data.svg_version !== svgImg.dataset.version) {
+            svgImg.src = '/lab_room.svg?v=' + data.svg_version;
+            svgImg.dataset.version = data.svg_version;
         }
     } catch (e) {
         // Silently fail - will retry next interval
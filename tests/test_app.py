@@ -6,6 +6,7 @@ import time
 from unittest import mock
 from datetime import datetime, timedelta
 
+import pymysql
 import pytest
 
 # Must be imported after lab_utils
@@ -27,14 +28,23 @@ def client():
 
 
 @pytest.fixture(autouse=True)
-def reset_caches():
+def reset_caches(tmp_path):
     """Reset all caches between tests."""
     import app as app_module
-    app_module._svg_cache = {'content': None, 'hash': None, 'time': 0}
-    app_module._about_content = None
-    app_module._admin_cache = {'emails': None, 'time': 0, 'mtime': 0}
+    app_module._svg_cache = {'content': None, 'gzip': None, 'br': None, 'hash': None}
+    app_module._admin_cache = {'emails': None, 'time': 0}
+    app_module._station_rows_cache = {'rows': None, 'time': 0, 'version': 0}
+    app_module._station_csv_cache = {'data': None, 'checked': 0}
+    app_module._lab_status_cache = {'key': None, 'value': None}
+    app_module._lab_data_cache = {'body': None, 'etag': None, 'time': 0, 'version': None}
+    app_module._about_page = {'html': None, 'etag': None}
+    app_module._google_certs_cache = {}
+    app_module._id_token_cache = {}
     lab_utils._calendar_cache = {'result': None, 'time': 0, 'mtime': 0}
-    yield
+    lab_utils._file_cache.clear()
+    with mock.patch.object(lab_utils, 'OVERRIDES_VERSION_PATH', str(tmp_path / 'overrides_version.txt')), \
+         mock.patch.object(lab_utils, 'QUEUES_VERSION_PATH', str(tmp_path / 'queues_version.txt')):
+        yield
 
 
 @pytest.fixture
@@ -94,13 +104,26 @@ class TestAboutRoute:
         resp = client.get('/about')
         assert resp.status_code == 200
 
-    def test_about_caches_content(self, client):
+    def test_about_content_loaded_at_import(self, client):
         import app as app_module
-        assert app_module._about_content is None
-        client.get('/about')
-        assert app_module._about_content is not None
-        # Second request uses cache
-        client.get('/about')
+        assert app_module._about_content
+        real_open = open
+
+        def guarded_open(path, *args, **kwargs):
+            assert path != app_module.ABOUT_PATH, 'about page re-read from disk'
+            return real_open(path, *args, **kwargs)
+
+        with mock.patch('builtins.open', guarded_open):
+            resp = client.get('/about')
+        assert resp.status_code == 200
+
+    def test_about_rendered_once_and_revalidates(self, client):
+        first = client.get('/about')
+        with mock.patch('app.render_template') as render:
+            again = client.get('/about', headers={'If-None-Match': first.headers['ETag']})
+        render.assert_not_called()
+        assert again.status_code == 304
+        assert first.data.startswith(b'<!DOCTYPE html>')
 
 
 # ---------------------------------------------------------------------------
@@ -115,7 +138,7 @@ class TestSvgEndpoint:
 
     def test_svg_has_cache_headers(self, client):
         resp = client.get('/lab_room.svg')
-        assert resp.headers.get('Cache-Control') == 'public, max-age=5'
+        assert resp.headers.get('Cache-Control') == 'public, max-age=5, must-revalidate'
         assert resp.headers.get('ETag') is not None
 
     def test_svg_contains_desk_paths(self, client):
@@ -123,6 +146,101 @@ class TestSvgEndpoint:
         svg = resp.data.decode()
         assert 'desk-1' in svg
 
+    def test_svg_desk_colors_follow_station_state(self, client):
+        import re
+        import app as app_module
+        with mock.patch('app.get_station_data', return_value=[(1, True), (6, False)]), \
+             mock.patch('app.get_claimed_stations', return_value={}):
+            svg = client.get('/lab_room.svg').data.decode()
+
+        def fill(n):
+            return re.search(rf'<path id="desk-{n}"[^>]*fill="([^"]*)"', svg).group(1)
+
+        assert fill(1) == app_module.RED
+        assert fill(6) == app_module.GREEN
+        assert fill(2) == app_module._SVG_DEFAULT_FILLS[2]
+
+    def test_svg_version_tracks_desk_colors(self):
+        import app as app_module
+        with mock.patch('app.get_claimed_stations', return_value={6: {}}):
+            with mock.patch('app.get_station_data', return_value=[(1, True), (6, False)]):
+                _, before = app_module.get_svg_state()
+            with mock.patch('app.get_station_data', return_value=[(1, False), (6, False)]):
+                _, after = app_module.get_svg_state()
+        assert before.startswith(app_module._SVG_TEMPLATE_ID + '-')
+        assert sorted(before[len(app_module._SVG_TEMPLATE_ID) + 1:]) == sorted('ry' + '_' * 9)
+        assert before != after
+
+    def test_svg_gzip_when_accepted(self, client):
+        import gzip
+        plain = client.get('/lab_room.svg')
+        resp = client.get('/lab_room.svg', headers={'Accept-Encoding': 'gzip, br'})
+        assert resp.headers.get('Content-Encoding') == 'gzip'
+        assert 'Accept-Encoding' in resp.headers.get('Vary', '')
+        assert gzip.decompress(resp.data) == plain.data
+        assert resp.headers['ETag'] != plain.headers['ETag']
+
+    def test_svg_brotli_when_available_and_accepted(self, client):
+        fake_brotli = mock.Mock()
+        fake_brotli.compress.return_value = b'br-body'
+        with mock.patch('app.brotli', fake_brotli):
+            resp = client.get('/lab_room.svg', headers={'Accept-Encoding': 'gzip, br'})
+        assert resp.headers.get('Content-Encoding') == 'br'
+        assert resp.data == b'br-body'
+        assert resp.headers['ETag'].endswith('-br"')
+
+    def test_current_svg_version_cached_as_immutable(self, client):
+        import app as app_module
+        with app.test_request_context('/'):
+            version = app_module.get_svg_state()[1]
+        resp = client.get(f'/lab_room.svg?v={version}')
+        assert resp.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    def test_stale_svg_version_gets_short_cache(self, client):
+        resp = client.get('/lab_room.svg?v=old')
+        assert resp.status_code == 200
+        assert resp.headers['Cache-Control'] == 'public, max-age=5, must-revalidate'
+
+    def test_svg_not_modified_for_matching_etag(self, client):
+        etag = client.get('/lab_room.svg').headers['ETag']
+        resp = client.get('/lab_room.svg', headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert resp.data == b''
+
+    def test_concurrent_cold_requests_render_once(self):
+        import threading
+        import app as app_module
+        real_render = app_module._render_svg
+        calls = []
+
+        def slow_render(colors):
+            calls.append(colors)
+            time.sleep(0.05)
+            return real_render(colors)
+
+        def fetch():
+            with app.test_client() as c:
+                assert c.get('/lab_room.svg').status_code == 200
+
+        with mock.patch('app._render_svg', side_effect=slow_render):
+            threads = [threading.Thread(target=fetch) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert len(calls) == 1
+
+    def test_matching_etag_answered_without_rendering(self, client):
+        import app as app_module
+        etag = client.get('/lab_room.svg').headers['ETag']
+        app_module._svg_cache = {'content': None, 'gzip': None, 'br': None, 'hash': None}
+        with mock.patch('app._render_svg') as render:
+            resp = client.get('/lab_room.svg', headers={'If-None-Match': etag})
+        render.assert_not_called()
+        assert resp.status_code == 304
+        assert resp.headers['Cache-Control'] == 'public, max-age=5, must-revalidate'
+        assert resp.headers['ETag'] == etag
+
     def test_svg_caching_works(self, client):
         import app as app_module
         resp1 = client.get('/lab_room.svg')
@@ -132,6 +250,132 @@ class TestSvgEndpoint:
         resp2 = client.get('/lab_room.svg')
         etag2 = resp2.headers.get('ETag')
         assert etag1 == etag2
+        assert isinstance(app_module._svg_cache['content'], bytes)
+
+    def test_svg_template_not_reread_per_request(self, client):
+        import builtins
+        real_open = builtins.open
+
+        def guarded_open(path, *args, **kwargs):
+            assert os.fspath(path) != lab_utils.SVG_PATH, 'SVG template read from disk'
+            return real_open(path, *args, **kwargs)
+
+        with mock.patch('builtins.open', side_effect=guarded_open):
+            resp = client.get('/lab_room.svg')
+        assert resp.status_code == 200
+        assert b'desk-1' in resp.data
+
+
+# ---------------------------------------------------------------------------
+# Station data (CSV mode)
+# ---------------------------------------------------------------------------
+
+class TestStationDataCSV:
+    @pytest.fixture
+    def status_csv(self, tmp_path):
+        path = tmp_path / "station_status.csv"
+        path.write_text("station,occupied\n1,true\n2,False\n3,TRUE\n")
+        with mock.patch('app.CSV_PATH', str(path)), \
+             mock.patch('app.get_manual_overrides', return_value={}):
+            yield path
+
+    def test_parses_rows(self, status_csv):
+        import app as app_module
+        assert app_module.get_station_data() == [(1, True), (2, False), (3, True)]
+
+    def test_unchanged_file_not_reparsed(self, status_csv):
+        import app as app_module
+        app_module.get_station_data()
+        with mock.patch('app.iter_csv_columns') as reader:
+            app_module.get_station_data()
+        reader.assert_not_called()
+
+    def test_memoized_within_request(self, status_csv):
+        import app as app_module
+        with app.test_request_context('/'):
+            first = app_module.get_station_data()
+            with mock.patch('app._get_station_rows_csv') as rows:
+                assert app_module.get_station_data() is first
+            rows.assert_not_called()
+
+    def test_file_not_stat_within_check_interval(self, status_csv):
+        import app as app_module
+        app_module.get_station_data()
+        with mock.patch('app.os.stat') as stat:
+            app_module.get_station_data()
+        stat.assert_not_called()
+
+    def test_changed_file_reparsed(self, status_csv):
+        import app as app_module
+        app_module.get_station_data()
+        status_csv.write_text("station,occupied\n1,false\n")
+        app_module._station_csv_cache['checked'] -= app_module._STATION_CSV_CHECK_INTERVAL
+        assert app_module.get_station_data() == [(1, False)]
+
+
+# ---------------------------------------------------------------------------
+# Station data (database mode)
+# ---------------------------------------------------------------------------
+
+class TestStationDataDB:
+    @pytest.fixture(autouse=True)
+    def db_mode(self):
+        import app as app_module
+        with mock.patch('app._fetch_station_data', app_module._get_station_rows_db):
+            yield
+
+    def _conn(self, rows):
+        conn = mock.MagicMock()
+        conn.__enter__.return_value = conn
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = rows
+        return conn
+
+    def test_rows_cached_within_ttl(self):
+        import app as app_module
+        conn = self._conn([(1, 1), (2, 0)])
+        with mock.patch('app.get_db_connection', return_value=conn) as get_conn:
+            assert app_module.get_station_data() == [(1, 1), (2, 0)]
+            assert app_module.get_station_data() == [(1, 1), (2, 0)]
+        get_conn.assert_called_once()
+
+    def test_override_from_another_worker_refetches(self):
+        import app as app_module
+        conn = self._conn([(1, 0)])
+        with mock.patch('app.get_db_connection', return_value=conn) as get_conn:
+            app_module.get_station_data()
+            # Another worker's override commits and bumps the shared version
+            with mock.patch('lab_utils.get_db_connection'), \
+                 mock.patch.object(lab_utils, 'DATA_SOURCE', 'database'):
+                assert lab_utils.set_manual_override(1, True)[0] is True
+            conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [(1, 1)]
+            assert app_module.get_station_data() == [(1, 1)]
+        assert get_conn.call_count == 2
+
+    def test_overrides_joined_in_same_query(self):
+        import app as app_module
+        conn = self._conn([(1, 1)])
+        cursor = conn.cursor.return_value.__enter__.return_value
+        with mock.patch('app.get_db_connection', return_value=conn), \
+             mock.patch('app.get_manual_overrides') as overrides:
+            app_module.get_station_data()
+        overrides.assert_not_called()
+        cursor.execute.assert_called_once()
+        assert 'manual_overrides' in cursor.execute.call_args[0][0]
+
+    def test_serves_last_rows_when_db_down(self):
+        import app as app_module
+        app_module._station_rows_cache = {'rows': [(1, 0)], 'time': 0, 'version': 0}
+        with mock.patch('app.get_db_connection',
+                        side_effect=pymysql.OperationalError(2003, 'down')):
+            assert app_module.get_station_data() == [(1, 0)]
+
+    def test_db_error_without_cache_raises(self):
+        import app as app_module
+        with mock.patch('app.get_db_connection',
+                        side_effect=pymysql.OperationalError(2003, 'down')):
+            with pytest.raises(pymysql.OperationalError):
+                app_module.get_station_data()
 
 
 # ---------------------------------------------------------------------------
@@ -163,6 +407,85 @@ class TestLabDataApi:
         assert 'turtlebot' in data['queue']
         assert 'ur7e' in data['queue']
 
+    def test_queues_and_claims_read_once_per_poll(self, client):
+        import app as app_module
+        bundle = app_module.get_page_bundle()
+        with mock.patch('app.get_page_bundle', return_value=bundle) as get_bundle, \
+             mock.patch('app.get_claimed_stations') as claims, \
+             mock.patch('app.get_all_queues') as queues:
+            client.get('/api/lab-data')
+        get_bundle.assert_called_once()
+        claims.assert_not_called()
+        queues.assert_not_called()
+
+    def test_svg_version_matches_svg_etag(self, client):
+        data = client.get('/api/lab-data').get_json()
+        svg = client.get('/lab_room.svg', headers={'Accept-Encoding': 'identity'})
+        assert svg.headers['ETag'] == f'"{data["svg_version"]}"'
+
+    def test_body_shared_within_ttl(self, client):
+        first = client.get('/api/lab-data')
+        with mock.patch('app.get_lab_status') as status:
+            second = client.get('/api/lab-data')
+        status.assert_not_called()
+        assert second.data == first.data
+
+    def test_body_rebuilt_after_ttl(self, client):
+        import app as app_module
+        client.get('/api/lab-data')
+        app_module._lab_data_cache['time'] -= app_module._LAB_DATA_TTL
+        with mock.patch('app.get_lab_status', return_value={'state': 'Open'}):
+            data = client.get('/api/lab-data').get_json()
+        assert data['status'] == {'state': 'Open'}
+
+    def test_body_rebuilt_after_queue_write(self, client, tmp_queues):
+        tb_path, _ = tmp_queues
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', tb_path):
+            client.get('/api/lab-data')
+            assert lab_utils.remove_from_queue('turtlebot', 'alice@berkeley.edu') is True
+            data = client.get('/api/lab-data').get_json()
+        assert 'alice@berkeley.edu' not in json.dumps(data['queue'])
+
+    def test_body_rebuilt_after_override(self, client, tmp_path):
+        client.get('/api/lab-data')
+        with mock.patch.object(lab_utils, 'MANUAL_OVERRIDES_CSV_PATH', str(tmp_path / 'o.csv')):
+            assert lab_utils.set_manual_override(1, True)[0] is True
+        with mock.patch('app.get_lab_status', return_value={'state': 'Open'}):
+            data = client.get('/api/lab-data').get_json()
+        assert data['status'] == {'state': 'Open'}
+
+    def test_stdlib_encoding_without_orjson(self, client):
+        from flask.json.provider import DefaultJSONProvider
+        # Without orjson installed the app keeps Flask's default provider
+        with mock.patch('app.orjson', None), \
+             mock.patch.object(app, 'json', DefaultJSONProvider(app)):
+            data = client.get('/api/lab-data').get_json()
+        assert 'status' in data
+
+    def test_not_modified_for_matching_etag(self, client):
+        etag = client.get('/api/lab-data').headers['ETag']
+        resp = client.get('/api/lab-data', headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert resp.data == b''
+
+
+class TestOrjsonProvider:
+    @pytest.fixture
+    def provider(self):
+        pytest.importorskip('orjson')
+        import app as app_module
+        return app_module.OrjsonProvider(app)
+
+    def test_matches_flask_key_handling(self, provider):
+        assert provider.dumps({'b': 1, 2: 'x', 'a': None}) == '{"2":"x","a":null,"b":1}'
+
+    def test_dates_use_flask_fallback(self, provider):
+        assert provider.dumps({'at': datetime(2024, 1, 2, 3, 4, 5)}) == \
+            '{"at":"Tue, 02 Jan 2024 03:04:05 GMT"}'
+
+    def test_request_json_parsed(self, provider):
+        assert provider.loads(b'{"queue_type": "ur7e"}') == {'queue_type': 'ur7e'}
+
 
 # ---------------------------------------------------------------------------
 # Auth endpoints
@@ -187,6 +510,53 @@ class TestAuthEndpoints:
         resp = client.get('/api/auth/user')
         assert resp.status_code == 401
 
+    def test_google_login_keeps_email_case(self, client):
+        idinfo = {'email': 'Student@berkeley.edu', 'name': 'Student', 'picture': None}
+        with mock.patch('app.id_token.verify_oauth2_token', return_value=idinfo):
+            resp = client.post('/api/auth/google', json={'credential': 'tok'})
+        assert resp.status_code == 200
+        assert client.get('/api/auth/user').get_json()['email'] == 'Student@berkeley.edu'
+
+    def test_repeated_token_verified_once(self):
+        import app as app_module
+        idinfo = {'email': 'a@berkeley.edu', 'exp': time.time() + 3600}
+        with mock.patch('app.id_token.verify_oauth2_token', return_value=idinfo) as verify:
+            assert app_module._verify_google_token('tok') is idinfo
+            assert app_module._verify_google_token('tok') is idinfo
+        verify.assert_called_once()
+
+    def test_token_not_reused_past_its_exp(self):
+        import app as app_module
+        idinfo = {'email': 'a@berkeley.edu', 'exp': time.time() - 1}
+        with mock.patch('app.id_token.verify_oauth2_token', return_value=idinfo) as verify:
+            app_module._verify_google_token('tok')
+            app_module._verify_google_token('tok')
+        assert verify.call_count == 2
+
+    def test_google_certs_fetched_once_within_max_age(self):
+        import app as app_module
+        certs = mock.Mock(status=200, headers={'cache-control': 'public, max-age=600'})
+        with mock.patch.object(app_module, '_google_request', return_value=certs) as fetch:
+            assert app_module._google_transport('https://certs') is certs
+            assert app_module._google_transport('https://certs') is certs
+        fetch.assert_called_once()
+
+    def test_google_certs_refetched_after_max_age(self):
+        import app as app_module
+        certs = mock.Mock(status=200, headers={'cache-control': 'max-age=0'})
+        with mock.patch.object(app_module, '_google_request', return_value=certs) as fetch:
+            app_module._google_transport('https://certs')
+            app_module._google_transport('https://certs')
+        assert fetch.call_count == 2
+
+    def test_google_error_response_not_cached(self):
+        import app as app_module
+        error = mock.Mock(status=500, headers={})
+        with mock.patch.object(app_module, '_google_request', return_value=error) as fetch:
+            app_module._google_transport('https://certs')
+            app_module._google_transport('https://certs')
+        assert fetch.call_count == 2
+
 
 # ---------------------------------------------------------------------------
 # Queue API endpoints
@@ -198,6 +568,13 @@ class TestQueueAdd:
                           json={'queue_type': 'turtlebot'})
         assert resp.status_code == 401
 
+    def test_add_outside_queue_hours_skips_station_reads(self, client, mock_session):
+        with mock.patch('app.lab_utils.is_queue_active_time', return_value=False), \
+             mock.patch('app.get_station_data') as stations:
+            resp = client.post('/api/queue/add', json={'queue_type': 'turtlebot'})
+        assert resp.status_code == 403
+        stations.assert_not_called()
+
     def test_add_invalid_type(self, client, mock_session):
         resp = client.post('/api/queue/add',
                           json={'queue_type': 'invalid'})
@@ -242,6 +619,47 @@ class TestQueueRemove:
         assert resp.status_code == 404
 
 
+class TestQueueValidation:
+    def test_non_json_body_rejected_before_queue_access(self, client, mock_admin_session):
+        with mock.patch('app.remove_from_queue') as remove:
+            resp = client.post('/api/queue/remove', data='not json',
+                               content_type='text/plain')
+        assert resp.status_code == 400
+        assert resp.get_json() == {'error': 'Invalid queue type'}
+        remove.assert_not_called()
+
+    def test_unhashable_choice_rejected(self, client, mock_admin_session):
+        resp = client.post('/api/queue/reorder',
+                           json={'queue_type': ['turtlebot'], 'email': 'a@b.edu'})
+        assert resp.status_code == 400
+        assert resp.get_json() == {'error': 'Invalid queue type'}
+
+    def test_invalid_direction(self, client, mock_admin_session):
+        with mock.patch('app.reorder_queue') as reorder:
+            resp = client.post('/api/queue/reorder',
+                               json={'queue_type': 'ur7e', 'email': 'a@b.edu',
+                                     'direction': 'left'})
+        assert resp.get_json() == {'error': 'Invalid direction'}
+        reorder.assert_not_called()
+
+
+class TestRequireAdmin:
+    ADMIN_ENDPOINTS = ['/api/queue/remove', '/api/queue/reorder',
+                       '/api/queue/reposition', '/api/station/override']
+
+    @pytest.mark.parametrize('path', ADMIN_ENDPOINTS)
+    def test_signed_out_gets_401(self, client, path):
+        resp = client.post(path, json={})
+        assert resp.status_code == 401
+        assert resp.get_json() == {'error': 'Not authenticated'}
+
+    @pytest.mark.parametrize('path', ADMIN_ENDPOINTS)
+    def test_non_admin_gets_403(self, client, mock_session, path):
+        resp = client.post(path, json={})
+        assert resp.status_code == 403
+        assert resp.get_json() == {'error': 'Admin access required'}
+
+
 # ---------------------------------------------------------------------------
 # Station override API
 # ---------------------------------------------------------------------------
@@ -272,6 +690,26 @@ class TestStationOverride:
         assert 'overrides' in data
 
 
+# ---------------------------------------------------------------------------
+# Claim page
+# ---------------------------------------------------------------------------
+
+class TestClaimPage:
+    def test_shows_time_remaining(self, client):
+        claim = {'email': 'a@b.edu', 'name': 'Alice', 'station_type': 'turtlebot',
+                 'station': '1', 'claim_token': 'tok', 'confirmed': 'false',
+                 'expires_at': '', 'expires_at_ts': time.time() + 150.5}
+        with mock.patch('app.get_pending_claim', return_value=claim):
+            resp = client.get('/claim/tok')
+        assert resp.status_code == 200
+        assert b'2:30' in resp.data
+
+    def test_unknown_token(self, client):
+        with mock.patch('app.get_pending_claim', return_value=None):
+            resp = client.get('/claim/nope')
+        assert b'Invalid or expired claim link.' in resp.data
+
+
 # ---------------------------------------------------------------------------
 # Admin page
 # ---------------------------------------------------------------------------
@@ -292,12 +730,158 @@ class TestAdminPage:
         assert resp.status_code == 200
         assert b'Admin Page' in resp.data
 
+    def test_upload_redirects_signed_out_user(self, client):
+        resp = client.get('/admin/upload-calendar')
+        assert resp.status_code == 302
+        assert resp.headers['Location'].endswith('/admin')
+
+    def test_upload_redirects_non_admin(self, client, mock_session):
+        with mock.patch('app.is_admin_user', return_value=False):
+            resp = client.get('/admin/upload-calendar')
+        assert resp.status_code == 302
+        assert resp.headers['Location'].endswith('/admin')
+
+    def test_upload_saves_calendar(self, client, mock_admin_session, tmp_path):
+        import io
+        body = b'BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n'
+        with mock.patch('app.UPLOAD_FOLDER', str(tmp_path)):
+            resp = client.post('/admin/upload-calendar',
+                               data={'file': (io.BytesIO(body), 'cal.ics')},
+                               content_type='multipart/form-data')
+        assert resp.status_code == 200
+        assert (tmp_path / 'course_calendar.ics').read_bytes() == body
+
+    def test_admin_view_does_not_leak_into_cached_status(self, client, mock_admin_session):
+        import app as app_module
+        with mock.patch('app.lab_utils.is_queue_active_time', return_value=False):
+            client.get('/admin')
+            status = app_module.get_lab_status()
+        assert status['show_turtlebot_queue'] is False
+        assert status['show_ur7e_queue'] is False
+
+
+class TestIsAdminUser:
+    def test_reads_admin_file_case_insensitively(self, tmp_path):
+        from app import is_admin_user
+        admins = tmp_path / "admin_users.txt"
+        admins.write_text("# admins\nAdmin@Berkeley.edu\n")
+        with mock.patch('app.ADMIN_USERS_FILE', str(admins)):
+            assert is_admin_user('admin@berkeley.edu') is True
+            assert is_admin_user('other@berkeley.edu') is False
+
+    def test_file_not_stat_within_ttl(self, tmp_path):
+        from app import is_admin_user
+        admins = tmp_path / "admin_users.txt"
+        admins.write_text("admin@berkeley.edu\n")
+        with mock.patch('app.ADMIN_USERS_FILE', str(admins)):
+            is_admin_user('admin@berkeley.edu')
+            with mock.patch('app.os.stat') as stat:
+                assert is_admin_user('admin@berkeley.edu') is True
+            stat.assert_not_called()
+
+    def test_edit_picked_up_after_ttl(self, tmp_path):
+        import app as app_module
+        admins = tmp_path / "admin_users.txt"
+        admins.write_text("admin@berkeley.edu\n")
+        with mock.patch('app.ADMIN_USERS_FILE', str(admins)):
+            assert app_module.is_admin_user('new@berkeley.edu') is False
+            admins.write_text("admin@berkeley.edu\nnew@berkeley.edu\n")
+            bumped = os.stat(admins).st_mtime + 1
+            os.utime(admins, (bumped, bumped))
+            app_module._admin_cache['time'] -= app_module._ADMIN_CACHE_TTL
+            assert app_module.is_admin_user('new@berkeley.edu') is True
+
+    def test_same_mtime_edit_picked_up_by_size(self, tmp_path):
+        import app as app_module
+        admins = tmp_path / "admin_users.txt"
+        admins.write_text("admin@berkeley.edu\n")
+        with mock.patch('app.ADMIN_USERS_FILE', str(admins)):
+            assert app_module.is_admin_user('new@berkeley.edu') is False
+            st = os.stat(admins)
+            admins.write_text("admin@berkeley.edu\nnew@berkeley.edu\n")
+            os.utime(admins, ns=(st.st_atime_ns, st.st_mtime_ns))
+            app_module._admin_cache['time'] -= app_module._ADMIN_CACHE_TTL
+            assert app_module.is_admin_user('new@berkeley.edu') is True
+
+    def test_missing_file_means_no_admins(self, tmp_path):
+        from app import is_admin_user
+        with mock.patch('app.ADMIN_USERS_FILE', str(tmp_path / "missing.txt")):
+            assert is_admin_user('admin@berkeley.edu') is False
+
+    def test_mixed_case_session_email_is_admin(self, tmp_path):
+        import flask
+        import app as app_module
+        admins = tmp_path / "admin_users.txt"
+        admins.write_text("admin@berkeley.edu\n")
+        with mock.patch('app.ADMIN_USERS_FILE', str(admins)), \
+             app.test_request_context('/'):
+            # The session keeps the email exactly as Google returned it
+            flask.session['user'] = {'email': 'Admin@Berkeley.edu'}
+            assert app_module.current_user_is_admin() is True
+
+    def test_current_user_checked_once_per_request(self):
+        import flask
+        import app as app_module
+        with app.test_request_context('/'):
+            flask.session['user'] = {'email': 'admin@berkeley.edu'}
+            with mock.patch('app.is_admin_user', return_value=True) as check:
+                assert app_module.current_user_is_admin() is True
+                assert app_module.current_user_is_admin() is True
+            check.assert_called_once_with('admin@berkeley.edu')
+
+    def test_current_user_not_admin_when_signed_out(self):
+        import app as app_module
+        with app.test_request_context('/'):
+            assert app_module.current_user_is_admin() is False
+
+    def test_allowed_file(self):
+        from app import allowed_file
+        assert allowed_file('calendar.ICS') is True
+        assert allowed_file('calendar.txt') is False
+        assert allowed_file('ics') is False
+
 
 # ---------------------------------------------------------------------------
 # Lab status logic
 # ---------------------------------------------------------------------------
 
 class TestLabStatus:
+    def test_alt_text_lists_stations_by_type(self):
+        from app import generate_lab_alt_text
+        text = generate_lab_alt_text([(11, False), (2, False), (1, True), (7, 1), (6, 0)])
+        assert 'Turtlebot stations open: 2, 11.' in text
+        assert 'Turtlebot stations occupied: 1.' in text
+        assert 'UR7e stations open: 6.' in text
+        assert 'UR7e stations occupied: 7.' in text
+
+    def test_alt_text_omits_stations_without_data(self):
+        from app import generate_lab_alt_text
+        text = generate_lab_alt_text([(2, False)])
+        assert 'Turtlebot stations open: 2.' in text
+        assert 'UR7e' not in text
+
+    def test_lab_view_built_once_per_request(self):
+        import app as app_module
+        rows = [(1, True), (2, False), (6, 0)]
+        with app.test_request_context('/'), \
+             mock.patch.object(app_module, 'get_station_data', return_value=rows), \
+             mock.patch.object(app_module, '_build_lab_view',
+                               wraps=app_module._build_lab_view) as build:
+            view = app_module.compute_lab_view()
+            assert app_module.compute_lab_view() is view
+        build.assert_called_once()
+        assert view.present == (1 << 1) | (1 << 2) | (1 << 6)
+        assert view.occupied == 1 << 1
+        assert view.station_colors == {1: app_module.RED, 2: app_module.GREEN,
+                                       6: app_module.GREEN}
+
+    def test_lab_view_last_row_wins_and_unknown_stations_ignored(self):
+        import app as app_module
+        view = app_module._build_lab_view([(1, True), (1, False), (42, True)])
+        assert view.present == 1 << 1
+        assert view.occupied == 0
+        assert app_module._count_open(view, app_module._TURTLEBOT_MASK) == 1
+
     def test_state_open_when_available(self):
         from app import determine_lab_state
         with mock.patch('app.get_current_lab_event',
@@ -332,3 +916,45 @@ class TestLabStatus:
                               return_value={'type': 'maintenance', 'class': None}):
             state = determine_lab_state(5)
         assert state == 'Full'
+
+    def test_lab_status_reused_for_same_state(self):
+        import app as app_module
+        rows = [(1, False), (6, True)]
+        with mock.patch.object(app_module, 'get_station_data', return_value=rows), \
+             mock.patch.object(app_module, '_format_alt_text',
+                               wraps=app_module._format_alt_text) as alt:
+            first = app_module.get_lab_status()
+            second = app_module.get_lab_status()
+        assert first is second
+        assert alt.call_count == 1
+
+    def test_lab_status_reused_for_equal_rebuilt_rows(self):
+        import app as app_module
+        # Override application builds a new, equal list on each request
+        with mock.patch.object(app_module, 'get_station_data',
+                               side_effect=lambda: [(1, False), (6, True)]):
+            first = app_module.get_lab_status()
+            second = app_module.get_lab_status()
+        assert first is second
+
+    def test_lab_status_recomputed_when_event_changes(self):
+        import app as app_module
+        rows = [(1, False), (6, True)]
+        with mock.patch.object(app_module, 'get_station_data', return_value=rows):
+            with mock.patch.object(app_module, 'get_current_lab_event',
+                                   return_value={'type': None, 'class': None}):
+                before = app_module.get_lab_status()
+            with mock.patch.object(app_module, 'get_current_lab_event',
+                                   return_value={'type': 'maintenance', 'class': None}):
+                after = app_module.get_lab_status()
+        assert before['state'] == 'Open'
+        assert after['state'] == 'Full'
+
+    def test_lab_status_counts_match_alt_text(self):
+        import app as app_module
+        rows = [(1, False), (2, True), (6, False), (7, False), (99, False)]
+        with mock.patch.object(app_module, 'get_station_data', return_value=rows):
+            status = app_module.get_lab_status()
+        assert status['turtlebots_available'] == 1
+        assert status['ur7es_available'] == 2
+        assert status['alt_text'] == app_module.generate_lab_alt_text(rows)
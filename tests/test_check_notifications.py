@@ -2,23 +2,26 @@
 import os
 import csv
 import json
+import smtplib
 from unittest import mock
 from datetime import datetime, timedelta
 
 import pytest
 
 import lab_utils
+import check_notifications
 from check_notifications import (
-    has_pending_claim,
-    person_has_active_claim,
     check_expired_claims,
 )
 
 
 @pytest.fixture(autouse=True)
-def reset_cache():
+def reset_cache(tmp_path):
     lab_utils._calendar_cache = {'result': None, 'time': 0, 'mtime': 0}
-    yield
+    lab_utils._file_cache.clear()
+    with mock.patch.object(lab_utils, 'OVERRIDES_VERSION_PATH', str(tmp_path / 'overrides_version.txt')), \
+         mock.patch.object(lab_utils, 'QUEUES_VERSION_PATH', str(tmp_path / 'queues_version.txt')):
+        yield
 
 
 # ---------------------------------------------------------------------------
@@ -34,6 +37,22 @@ class TestGetCurrentStates:
                 states = lab_utils.get_station_states()
         assert states == {1: True, 2: False, 3: True, 4: False}
 
+    def test_accepts_mixed_case_and_yes(self, tmp_path):
+        csv_file = tmp_path / "station_status.csv"
+        csv_file.write_text("station,occupied\n1,True\n2,yes\n3,no\n4,FALSE\n")
+        with mock.patch.object(lab_utils, 'STATION_STATUS_CSV_PATH', str(csv_file)):
+            with mock.patch.object(lab_utils, 'get_manual_overrides', return_value={}):
+                states = lab_utils.get_station_states()
+        assert states == {1: True, 2: True, 3: False, 4: False}
+
+    def test_padded_and_unknown_values(self, tmp_path):
+        csv_file = tmp_path / "station_status.csv"
+        csv_file.write_text('station,occupied\n1," true"\n2,10\n3,yikes\n4," YES "\n')
+        with mock.patch.object(lab_utils, 'STATION_STATUS_CSV_PATH', str(csv_file)):
+            with mock.patch.object(lab_utils, 'get_manual_overrides', return_value={}):
+                states = lab_utils.get_station_states()
+        assert states == {1: True, 2: False, 3: False, 4: True}
+
     def test_applies_overrides(self, tmp_path):
         csv_file = tmp_path / "station_status.csv"
         csv_file.write_text("station,occupied\n1,true\n2,false\n")
@@ -89,43 +108,32 @@ class TestGetFirstInQueue:
             person = lab_utils.get_first_in_queue('turtlebot')
         assert person is None
 
+    def test_repeat_lookup_reuses_parse_until_queue_changes(self, tmp_path):
+        csv_file = tmp_path / "queue.csv"
+        csv_file.write_text("name,email\nAlice,a@b.edu\nBob,b@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(csv_file)):
+            lab_utils.get_first_in_queue('turtlebot')
+            with mock.patch.object(lab_utils, 'iter_csv_columns') as parse:
+                lab_utils.get_first_in_queue('turtlebot')
+            parse.assert_not_called()
+            lab_utils.remove_from_queue('turtlebot', 'a@b.edu')
+            person = lab_utils.get_first_in_queue('turtlebot')
+        assert person == {'name': 'Bob', 'email': 'b@b.edu'}
+
 
 # ---------------------------------------------------------------------------
-# has_pending_claim / person_has_active_claim
+# Claim expiry
 # ---------------------------------------------------------------------------
 
-class TestClaimChecks:
-    def _make_claim(self, station_type='turtlebot', email='a@b.edu',
-                    expired=False, confirmed=False):
-        expires = datetime.now() + (timedelta(minutes=-1) if expired else timedelta(minutes=5))
-        return {
-            'station_type': station_type,
-            'email': email,
-            'station': '1',
-            'claim_token': 'tok123',
-            'expires_at': expires.isoformat(),
-            'confirmed': 'true' if confirmed else 'false',
-        }
-
-    def test_has_pending_claim_active(self):
-        claims = [self._make_claim()]
-        assert has_pending_claim('turtlebot', claims) is True
-
-    def test_has_pending_claim_none(self):
-        assert has_pending_claim('turtlebot', []) is False
-
-    def test_has_pending_claim_expired(self):
-        claims = [self._make_claim(expired=True)]
-        assert has_pending_claim('turtlebot', claims) is False
-
-    def test_has_pending_claim_confirmed_never_expires(self):
-        claims = [self._make_claim(expired=True, confirmed=True)]
-        assert has_pending_claim('turtlebot', claims) is True
-
-    def test_person_has_active_claim(self):
-        claims = [self._make_claim(email='test@b.edu')]
-        assert person_has_active_claim('test@b.edu', claims) is True
-        assert person_has_active_claim('other@b.edu', claims) is False
+class TestClaimExpiry:
+    def test_expiry_parsed_once_per_claim(self):
+        expires = datetime.now() + timedelta(minutes=5)
+        claim = {'expires_at': expires.isoformat()}
+        with mock.patch('check_notifications.datetime', wraps=datetime) as dt:
+            first = check_notifications._expires_at_ts(claim)
+            assert check_notifications._expires_at_ts(claim) == first
+        assert dt.fromisoformat.call_count == 1
+        assert first == pytest.approx(expires.timestamp())
 
 
 # ---------------------------------------------------------------------------
@@ -147,6 +155,21 @@ class TestCheckExpiredClaims:
         with mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(claims_path)):
             result = check_expired_claims([active_claim], {1: False})
         assert len(result) == 1
+        # The parsed expiry is kept on the claim but not written to the CSV
+        assert 'expires_at_ts' in result[0]
+        assert claims_path.read_text().splitlines()[0] == \
+            "email,name,station_type,station,claim_token,expires_at,confirmed"
+
+    def test_unchanged_claims_not_rewritten(self):
+        active_claim = {
+            'email': 'a@b.edu', 'name': 'Alice', 'station_type': 'turtlebot',
+            'station': '1', 'claim_token': 'tok1',
+            'expires_at': (datetime.now() + timedelta(minutes=3)).isoformat(),
+            'confirmed': 'false',
+        }
+        with mock.patch('check_notifications.save_pending_claims') as save:
+            check_expired_claims([active_claim], {1: False})
+        save.assert_not_called()
 
     def test_removes_expired_unconfirmed(self, tmp_path):
         claims_path = tmp_path / "claims.csv"
@@ -182,3 +205,161 @@ class TestCheckExpiredClaims:
         with mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(claims_path)):
             result = check_expired_claims([confirmed_claim], {1: True})
         assert len(result) == 0  # Claim should be cleared
+
+
+# ---------------------------------------------------------------------------
+# main() freed-station notifications
+# ---------------------------------------------------------------------------
+
+class TestFreedStations:
+    def _run_main(self, current, previous, claims, first):
+        with mock.patch('check_notifications.is_queue_active_time', return_value=True), \
+             mock.patch.object(lab_utils, 'DATA_SOURCE', 'database'), \
+             mock.patch('check_notifications.get_station_states', return_value=current), \
+             mock.patch('check_notifications.get_previous_states', return_value=previous), \
+             mock.patch('check_notifications.get_all_pending_claims', return_value=claims), \
+             mock.patch('check_notifications.save_pending_claims'), \
+             mock.patch('check_notifications.save_states') as save_states, \
+             mock.patch('check_notifications.get_first_in_queue', return_value=first), \
+             mock.patch('check_notifications.dal_create_pending_claim'), \
+             mock.patch('check_notifications.send_notification_email') as send:
+            check_notifications.main()
+        self.save_states = save_states
+        return send
+
+    def test_one_claim_per_type_per_tick(self):
+        send = self._run_main({1: False, 2: False}, {1: True, 2: True}, [],
+                              {'name': 'Alice', 'email': 'a@b.edu'})
+        send.assert_called_once()
+        assert send.call_args[0][:4] == ('a@b.edu', 'Alice', 'turtlebot', 1)
+
+    def test_unchanged_states_not_saved(self):
+        self._run_main({1: True}, {1: True}, [], None)
+        self.save_states.assert_not_called()
+        self._run_main({1: False}, {1: True}, [], None)
+        self.save_states.assert_called_once_with({1: False})
+
+    def test_person_with_active_claim_not_notified_again(self):
+        claim = {
+            'email': 'a@b.edu', 'name': 'Alice', 'station_type': 'ur7e',
+            'station': '6', 'claim_token': 'tok1',
+            'expires_at': (datetime.now() + timedelta(minutes=3)).isoformat(),
+            'confirmed': 'false',
+        }
+        send = self._run_main({1: False}, {1: True}, [claim],
+                              {'name': 'Alice', 'email': 'a@b.edu'})
+        send.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# SmtpSession
+# ---------------------------------------------------------------------------
+
+class TestSmtpSession:
+    @pytest.fixture(autouse=True)
+    def gmail_configured(self):
+        with mock.patch('check_notifications.GMAIL_SENDER', 'lab@gmail.com'), \
+             mock.patch('check_notifications.GMAIL_APP_PASSWORD', 'pw'):
+            yield
+
+    def test_one_login_for_several_emails(self):
+        smtp = check_notifications.SmtpSession()
+        with mock.patch('check_notifications.smtplib.SMTP_SSL') as ssl:
+            for email in ('a@b.edu', 'b@b.edu'):
+                assert check_notifications.send_notification_email(
+                    email, 'Name', 'turtlebot', 1, 'tok', smtp=smtp)
+            smtp.close()
+        ssl.assert_called_once()
+        server = ssl.return_value
+        server.login.assert_called_once_with('lab@gmail.com', 'pw')
+        assert server.sendmail.call_count == 2
+        server.quit.assert_called_once()
+
+    def test_message_filled_from_templates(self):
+        from email import message_from_bytes
+        smtp = mock.Mock()
+        with mock.patch('check_notifications.BASE_URL', 'https://lab.test'):
+            check_notifications.send_notification_email(
+                'a@b.edu', 'Alice', 'ur7e', 6, 'tok123', smtp=smtp)
+        to_email, raw = smtp.send.call_args[0]
+        msg = message_from_bytes(raw)
+        assert to_email == 'a@b.edu'
+        assert msg['Subject'] == '[EE106A] Station 6 (UR7e) Available - Claim Now!'
+        text, html = (part.get_payload(decode=True).decode() for part in msg.get_payload())
+        assert 'Hi Alice,' in text
+        assert 'Click here to claim: https://lab.test/claim/tok123' in text
+        assert '<a href="https://lab.test/claim/tok123"' in html
+        assert '$' not in text + html
+
+    def test_without_session_connection_is_closed(self):
+        with mock.patch('check_notifications.smtplib.SMTP_SSL') as ssl:
+            assert check_notifications.send_notification_email(
+                'a@b.edu', 'Name', 'ur7e', 6, 'tok')
+        ssl.return_value.quit.assert_called_once()
+
+    def test_failed_send_reconnects_next_time(self):
+        smtp = check_notifications.SmtpSession()
+        with mock.patch('check_notifications.smtplib.SMTP_SSL') as ssl:
+            ssl.return_value.sendmail.side_effect = [smtplib.SMTPServerDisconnected, {}]
+            assert not check_notifications.send_notification_email(
+                'a@b.edu', 'Name', 'turtlebot', 1, 'tok', smtp=smtp)
+            assert check_notifications.send_notification_email(
+                'b@b.edu', 'Name', 'turtlebot', 1, 'tok', smtp=smtp)
+        assert ssl.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# main() idle-tick fingerprint
+# ---------------------------------------------------------------------------
+
+class TestTickFingerprint:
+    @pytest.fixture
+    def csv_dir(self, tmp_path):
+        (tmp_path / "station_status.csv").write_text("station,occupied\n1,true\n")
+        (tmp_path / "previous.json").write_text('{"1": true}')
+        (tmp_path / "claims.csv").write_text(
+            "email,name,station_type,station,claim_token,expires_at,confirmed\n")
+        paths = {
+            'STATION_STATUS_CSV_PATH': tmp_path / "station_status.csv",
+            'MANUAL_OVERRIDES_CSV_PATH': tmp_path / "overrides.csv",
+            'PREVIOUS_STATES_PATH': tmp_path / "previous.json",
+            'PENDING_CLAIMS_CSV_PATH': tmp_path / "claims.csv",
+            'QUEUE_TURTLEBOT_CSV_PATH': tmp_path / "queue_turtlebot.csv",
+            'QUEUE_UR7E_CSV_PATH': tmp_path / "queue_ur7e.csv",
+            'NOTIFY_FINGERPRINT_PATH': tmp_path / "fingerprint.txt",
+        }
+        patches = [mock.patch.object(lab_utils, name, str(path)) for name, path in paths.items()]
+        patches.append(mock.patch.object(lab_utils, 'DATA_SOURCE', 'csv'))
+        patches.append(mock.patch('check_notifications.is_queue_active_time', return_value=True))
+        for p in patches:
+            p.start()
+        yield tmp_path
+        for p in reversed(patches):
+            p.stop()
+
+    def test_unchanged_idle_tick_skipped(self, csv_dir):
+        check_notifications.main()
+        with mock.patch('check_notifications.get_station_states') as states:
+            check_notifications.main()
+        states.assert_not_called()
+
+    def test_station_change_runs_tick(self, csv_dir):
+        check_notifications.main()
+        (csv_dir / "station_status.csv").write_text("station,occupied\n1,false\n")
+        with mock.patch('check_notifications.get_station_states', return_value={1: False}) as states:
+            check_notifications.main()
+        states.assert_called_once()
+
+    def test_tick_with_active_claims_not_skipped(self, csv_dir):
+        active_claim = {
+            'email': 'a@b.edu', 'name': 'Alice', 'station_type': 'turtlebot',
+            'station': '1', 'claim_token': 'tok1',
+            'expires_at': (datetime.now() + timedelta(minutes=3)).isoformat(),
+            'confirmed': 'false',
+        }
+        lab_utils.save_pending_claims([active_claim])
+        check_notifications.main()
+        assert not (csv_dir / "fingerprint.txt").exists()
+        with mock.patch('check_notifications.get_station_states', return_value={1: True}) as states:
+            check_notifications.main()
+        states.assert_called_once()
@@ -2,6 +2,7 @@
 
 All DB calls are mocked — no actual database connection is needed.
 """
+import gc
 import pymysql
 from unittest import mock
 from datetime import datetime, timedelta
@@ -12,11 +13,15 @@ import lab_utils
 
 
 @pytest.fixture(autouse=True)
-def use_db_mode():
+def use_db_mode(tmp_path):
     """Force DATA_SOURCE='database' for all tests in this module."""
     original = lab_utils.DATA_SOURCE
     lab_utils.DATA_SOURCE = 'database'
-    yield
+    with mock.patch.object(lab_utils, 'OVERRIDES_VERSION_PATH',
+                           str(tmp_path / 'overrides_version.txt')), \
+         mock.patch.object(lab_utils, 'QUEUES_VERSION_PATH',
+                           str(tmp_path / 'queues_version.txt')):
+        yield
     lab_utils.DATA_SOURCE = original
 
 
@@ -64,6 +69,28 @@ class TestSetManualOverrideDB:
         assert 'occupied' in msg
         conn.commit.assert_called_once()
 
+    def test_set_override_bumps_version(self, mock_conn):
+        conn, cursor = mock_conn
+        before = lab_utils.overrides_version()
+        with mock.patch.object(lab_utils, 'get_db_connection', return_value=conn):
+            lab_utils.set_manual_override(3, True)
+        assert lab_utils.overrides_version() > before
+
+    def test_version_bump_failure_still_reports_success(self, mock_conn):
+        conn, cursor = mock_conn
+        with mock.patch.object(lab_utils, 'get_db_connection', return_value=conn), \
+             mock.patch.object(lab_utils.os, 'utime', side_effect=PermissionError):
+            success, msg = lab_utils.set_manual_override(3, True)
+        assert success is True
+        conn.commit.assert_called_once()
+
+    def test_failed_clear_leaves_version(self, mock_conn):
+        conn, cursor = mock_conn
+        cursor.rowcount = 0
+        with mock.patch.object(lab_utils, 'get_db_connection', return_value=conn):
+            lab_utils.set_manual_override(99, None)
+        assert lab_utils.overrides_version() == 0
+
     def test_clear_override(self, mock_conn):
         conn, cursor = mock_conn
         cursor.rowcount = 1
@@ -104,6 +131,26 @@ class TestGetQueueDB:
         assert result == []
 
 
+class TestGetAllQueuesDB:
+    def test_single_query_bucketed_by_type(self, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [
+            ('turtlebot', 'Alice', 'a@b.edu'),
+            ('ur7e', 'Bob', 'b@b.edu'),
+            ('ur7e', 'Carol', 'c@b.edu'),
+        ]
+        with mock.patch.object(lab_utils, 'get_db_connection', return_value=conn):
+            result = lab_utils.get_all_queues()
+        assert cursor.execute.call_count == 1
+        assert result == {
+            'turtlebot': [{'name': 'Alice', 'email': 'a@b.edu'}],
+            'ur7e': [
+                {'name': 'Bob', 'email': 'b@b.edu'},
+                {'name': 'Carol', 'email': 'c@b.edu'},
+            ],
+        }
+
+
 class TestGetFirstInQueueDB:
     def test_returns_first(self, mock_conn):
         conn, cursor = mock_conn
@@ -219,6 +266,28 @@ class TestGetClaimedStationsDB:
         assert result == {}
 
 
+class TestGetPageBundleDB:
+    def test_queues_and_claims_over_one_connection(self, mock_conn):
+        conn, cursor = mock_conn
+        future = datetime.now() + timedelta(minutes=3)
+        cursor.fetchall.side_effect = [
+            [('ur7e', 'Bob', 'b@b.edu')],
+            [(5, 'Alice', future, False)],
+        ]
+        with mock.patch.object(lab_utils, 'get_db_connection', return_value=conn) as get_conn:
+            bundle = lab_utils.get_page_bundle()
+        get_conn.assert_called_once()
+        assert bundle.queues == {'turtlebot': [], 'ur7e': [{'name': 'Bob', 'email': 'b@b.edu'}]}
+        assert list(bundle.claimed_stations) == [5]
+
+    def test_db_error_returns_empty(self):
+        with mock.patch.object(lab_utils, 'get_db_connection',
+                               side_effect=Exception('down')):
+            bundle = lab_utils.get_page_bundle()
+        assert bundle.queues == {'turtlebot': [], 'ur7e': []}
+        assert bundle.claimed_stations == {}
+
+
 class TestGetPendingClaimDB:
     def test_found(self, mock_conn):
         conn, cursor = mock_conn
@@ -231,6 +300,7 @@ class TestGetPendingClaimDB:
         assert result is not None
         assert result['email'] == 'a@b.edu'
         assert result['station'] == '5'
+        assert result['expires_at_ts'] == future.timestamp()
 
     def test_not_found(self, mock_conn):
         conn, cursor = mock_conn
@@ -349,3 +419,71 @@ class TestGetAllPendingClaimsDB:
         assert claims[0]['email'] == 'a@b.edu'
         assert claims[0]['confirmed'] == 'false'
         assert claims[1]['confirmed'] == 'true'
+
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+class TestConnectionPool:
+    @pytest.fixture(autouse=True)
+    def empty_pool(self):
+        """Give each test its own empty pool."""
+        # Proxies left in reference cycles by earlier tests release their
+        # connection when collected; do that now, not mid-test
+        gc.collect()
+        with mock.patch.object(lab_utils, '_db_pool', lab_utils.queue.LifoQueue(maxsize=2)):
+            yield
+
+    def test_close_returns_connection_to_pool(self):
+        raw = mock.MagicMock()
+        with mock.patch.object(lab_utils.pymysql, 'connect', return_value=raw) as connect:
+            conn = lab_utils.get_db_connection()
+            conn.close()
+            lab_utils.get_db_connection().close()
+        connect.assert_called_once()
+        raw.ping.assert_not_called()  # reused right away, no ping needed
+        raw.close.assert_not_called()
+
+    def test_unclosed_connection_returned_when_dropped(self):
+        raw = mock.MagicMock()
+        raw.cursor.return_value.execute.side_effect = pymysql.OperationalError
+        with mock.patch.object(lab_utils.pymysql, 'connect', return_value=raw):
+            assert lab_utils.get_queue('turtlebot') == []  # errors before close()
+        raw.rollback.assert_called_once()
+        assert lab_utils._db_pool.get_nowait()[0] is raw
+
+    def test_long_idle_connection_is_pinged(self):
+        raw = mock.MagicMock()
+        idle_since = lab_utils.time.monotonic() - lab_utils._DB_POOL_PING_AFTER
+        lab_utils._db_pool.put_nowait((raw, idle_since))
+        conn = lab_utils.get_db_connection()
+        assert conn._conn is raw
+        raw.ping.assert_called_once_with(reconnect=True)
+
+    def test_release_rolls_back_open_transaction(self):
+        raw = mock.MagicMock()
+        with mock.patch.object(lab_utils.pymysql, 'connect', return_value=raw):
+            with lab_utils.get_db_connection() as conn:
+                conn.cursor()
+        raw.rollback.assert_called_once()
+
+    def test_dead_connection_is_replaced(self):
+        dead = mock.MagicMock()
+        dead.ping.side_effect = pymysql.OperationalError()
+        fresh = mock.MagicMock()
+        idle_since = lab_utils.time.monotonic() - lab_utils._DB_POOL_PING_AFTER
+        lab_utils._db_pool.put_nowait((dead, idle_since))
+        with mock.patch.object(lab_utils.pymysql, 'connect', return_value=fresh):
+            conn = lab_utils.get_db_connection()
+        assert conn._conn is fresh
+        dead.close.assert_called_once()
+
+    def test_full_pool_closes_extra_connections(self):
+        raws = [mock.MagicMock() for _ in range(3)]
+        with mock.patch.object(lab_utils.pymysql, 'connect', side_effect=raws):
+            conns = [lab_utils.get_db_connection() for _ in range(3)]
+        for conn in conns:
+            conn.close()
+        assert lab_utils._db_pool.qsize() == 2
+        raws[2].close.assert_called_once()
@@ -5,6 +5,7 @@ import json
 import time
 import tempfile
 import threading
+from contextlib import contextmanager
 from unittest import mock
 from datetime import datetime, timedelta
 
@@ -20,10 +21,13 @@ import lab_utils
 # ---------------------------------------------------------------------------
 
 @pytest.fixture(autouse=True)
-def reset_cache():
+def reset_cache(tmp_path):
     """Reset all caches between tests."""
     lab_utils._calendar_cache = {'result': None, 'time': 0, 'mtime': 0}
-    yield
+    lab_utils._file_cache.clear()
+    with mock.patch.object(lab_utils, 'OVERRIDES_VERSION_PATH', str(tmp_path / 'overrides_version.txt')), \
+         mock.patch.object(lab_utils, 'QUEUES_VERSION_PATH', str(tmp_path / 'queues_version.txt')):
+        yield
 
 
 @pytest.fixture
@@ -56,31 +60,38 @@ class TestStationGroupings:
     def test_no_overlap(self):
         assert lab_utils.TURTLEBOT_STATIONS & lab_utils.UR7E_STATIONS == set()
 
+    def test_station_type_matches_groupings(self):
+        for s in lab_utils.TURTLEBOT_STATIONS:
+            assert lab_utils.STATION_TYPE[s] == 'turtlebot'
+        for s in lab_utils.UR7E_STATIONS:
+            assert lab_utils.STATION_TYPE[s] == 'ur7e'
+
     def test_all_stations_covered(self):
         all_stations = lab_utils.TURTLEBOT_STATIONS | lab_utils.UR7E_STATIONS
         assert all_stations == {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11}
 
 
 # ---------------------------------------------------------------------------
-# DESK_REGEX
+# DESK_PATTERN
 # ---------------------------------------------------------------------------
 
-class TestDeskRegex:
-    def test_all_stations_have_regex(self):
+class TestDeskPattern:
+    def test_matches_every_station(self):
         all_stations = lab_utils.TURTLEBOT_STATIONS | lab_utils.UR7E_STATIONS
         for s in all_stations:
-            assert str(s) in lab_utils.DESK_REGEX
+            svg_snippet = f'<path id="desk-{s}" d="M10 20" fill="#FF0000" />'
+            match = lab_utils.DESK_PATTERN.search(svg_snippet)
+            assert match is not None
+            assert match.group(2) == str(s)
 
-    def test_regex_matches_svg_pattern(self):
-        svg_snippet = '<path id="desk-3" d="M10 20" fill="#FF0000" />'
-        pattern = lab_utils.DESK_REGEX['3']
-        match = pattern.search(svg_snippet)
-        assert match is not None
+    def test_finds_all_desks_in_one_pass(self):
+        svg = ('<path id="desk-3" fill="#FF0000" /><path id="wall" fill="#000" />'
+               '<path id="desk-10" d="M1 2" fill="#FF0000" />')
+        assert [m.group(2) for m in lab_utils.DESK_PATTERN.finditer(svg)] == ['3', '10']
 
     def test_regex_substitution(self):
         svg_snippet = '<path id="desk-7" d="M10 20" fill="#FF0000" />'
-        pattern = lab_utils.DESK_REGEX['7']
-        result = pattern.sub(r'\g<1>#00FF00\2', svg_snippet)
+        result = lab_utils.DESK_PATTERN.sub(r'\g<1>#00FF00\3', svg_snippet)
         assert '#00FF00' in result
         assert '#FF0000' not in result
 
@@ -137,6 +148,251 @@ class TestFileLock:
         assert len(entries) == 6  # Alice + 5 users
 
 
+class TestReplaceFile:
+    def test_replaces_contents_and_keeps_mode(self, tmp_path):
+        path = tmp_path / "queue.csv"
+        path.write_text("old\n")
+        os.chmod(path, 0o640)
+        lab_utils.replace_file(str(path), "new\r\n")
+        assert path.read_bytes() == b"new\r\n"
+        assert path.stat().st_mode & 0o777 == 0o640
+        assert os.listdir(tmp_path) == ["queue.csv"]
+
+    def test_data_synced_before_rename(self, tmp_path):
+        path = tmp_path / "queue.csv"
+        calls = []
+        with mock.patch.object(lab_utils.os, 'fsync', side_effect=lambda fd: calls.append('fsync')), \
+             mock.patch.object(lab_utils.os, 'replace',
+                               side_effect=lambda *a: calls.append('replace') or os.rename(*a)):
+            lab_utils.replace_file(str(path), "new\n")
+        assert calls == ['fsync', 'replace']
+        assert path.read_text() == "new\n"
+
+    def test_lock_option_holds_lock_only_for_rename(self, tmp_path):
+        path = tmp_path / "pending_claims.csv"
+        seen = []
+
+        @contextmanager
+        def recording_lock(p):
+            # By the time the lock is taken the data is already in a temp file
+            seen.append(sorted(os.listdir(tmp_path)))
+            yield
+
+        with mock.patch.object(lab_utils, 'file_lock', recording_lock), \
+             mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(path)):
+            lab_utils.save_pending_claims([])
+        assert len(seen) == 1 and len(seen[0]) == 1
+        assert seen[0][0].startswith('.pending_claims.csv.')
+        assert path.read_text().startswith('email,name,')
+
+    def test_failed_replace_leaves_original(self, tmp_path):
+        path = tmp_path / "queue.csv"
+        path.write_text("old\n")
+        with mock.patch.object(lab_utils.os, 'replace', side_effect=OSError):
+            with pytest.raises(OSError):
+                lab_utils.replace_file(str(path), "new\n")
+        assert path.read_text() == "old\n"
+        assert os.listdir(tmp_path) == ["queue.csv"]
+
+
+# ---------------------------------------------------------------------------
+# iter_csv_columns
+# ---------------------------------------------------------------------------
+
+class TestIterCsvColumns:
+    def test_columns_resolved_from_header(self, tmp_path):
+        path = tmp_path / "q.csv"
+        path.write_text("email,name\na@b.edu,Alice\n\nb@b.edu,Bob\n")
+        with open(path, newline='') as f:
+            rows = list(lab_utils.iter_csv_columns(f, 'name', 'email'))
+        assert rows == [('Alice', 'a@b.edu'), ('Bob', 'b@b.edu')]
+
+    def test_empty_file_yields_nothing(self, tmp_path):
+        path = tmp_path / "q.csv"
+        path.write_text("")
+        with open(path, newline='') as f:
+            assert list(lab_utils.iter_csv_columns(f, 'name', 'email')) == []
+
+    def test_missing_column_raises(self, tmp_path):
+        path = tmp_path / "q.csv"
+        path.write_text("name\nAlice\n")
+        with open(path, newline='') as f:
+            with pytest.raises(ValueError):
+                list(lab_utils.iter_csv_columns(f, 'name', 'email'))
+
+
+class TestCsvLine:
+    @pytest.mark.parametrize('row', [
+        ('Alice', 'a@b.edu'),
+        ('Bob, Jr.', 'b@b.edu'),
+        ('Say "hi"', 'c@b.edu'),
+        ('two\nlines', 'd@b.edu'),
+        ('', ''),
+    ])
+    def test_matches_csv_writer(self, row):
+        import io
+        buf = io.StringIO()
+        csv.writer(buf).writerow(row)
+        assert lab_utils._csv_line(*row) == buf.getvalue()
+
+
+class TestLoadCached:
+    def test_missing_file_returns_default(self, tmp_path):
+        assert lab_utils.load_cached(str(tmp_path / "missing"), len, 'none') == 'none'
+
+    def test_parsed_once_until_file_changes(self, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("one\n")
+        parser = mock.Mock(side_effect=lambda f: f.read())
+        assert lab_utils.load_cached(str(path), parser) == "one\n"
+        assert lab_utils.load_cached(str(path), parser) == "one\n"
+        path.write_text("three\n")
+        assert lab_utils.load_cached(str(path), parser) == "three\n"
+        assert parser.call_count == 2
+
+    def test_parser_error_not_cached(self, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("x\n")
+        with pytest.raises(ValueError):
+            lab_utils.load_cached(str(path), mock.Mock(side_effect=ValueError))
+        assert lab_utils.load_cached(str(path), lambda f: f.read()) == "x\n"
+
+    def test_invalidate_forces_reparse(self, tmp_path):
+        path = tmp_path / "data.txt"
+        path.write_text("x\n")
+        parser = mock.Mock(return_value='parsed')
+        lab_utils.load_cached(str(path), parser)
+        lab_utils.invalidate_cached(str(path))
+        lab_utils.load_cached(str(path), parser)
+        assert parser.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# Queue CSV reads
+# ---------------------------------------------------------------------------
+
+class TestGetAllQueuesCSV:
+    def test_reads_both_queues(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)), \
+             mock.patch.object(lab_utils, 'QUEUE_UR7E_CSV_PATH', str(tmp_path / "missing.csv")):
+            result = lab_utils.get_all_queues()
+        assert result == {'turtlebot': [{'name': 'Alice', 'email': 'a@b.edu'}], 'ur7e': []}
+
+    def test_unchanged_file_not_reparsed(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            first = lab_utils.get_queue('turtlebot')
+            with mock.patch.object(lab_utils, 'iter_csv_columns') as parse:
+                second = lab_utils.get_queue('turtlebot')
+            parse.assert_not_called()
+        assert first == second
+
+    def test_returned_entries_do_not_alias_cache(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            lab_utils.get_queue('turtlebot')[0]['name'] = 'Mallory'
+            assert lab_utils.get_queue('turtlebot')[0]['name'] == 'Alice'
+
+    def test_remove_absent_email_skips_lock(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)), \
+             mock.patch.object(lab_utils, 'file_lock') as lock:
+            assert lab_utils.remove_from_queue('turtlebot', 'z@b.edu') is False
+            assert lab_utils.reorder_queue('turtlebot', 'z@b.edu', 'up') == \
+                (False, 'User not found in queue')
+        lock.assert_not_called()
+
+    def test_malformed_header_reports_failure(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("foo,bar\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            assert lab_utils.remove_from_queue('turtlebot', 'a@b.edu') is False
+            ok, err = lab_utils.reorder_queue('turtlebot', 'a@b.edu', 'up')
+            assert ok is False and err.startswith('Error updating queue:')
+            ok, err = lab_utils.reposition_queue('turtlebot', 'a@b.edu', 0)
+            assert ok is False and err.startswith('Error updating queue:')
+
+    def test_remove_present_email(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\nBob,b@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            assert lab_utils.remove_from_queue('turtlebot', 'a@b.edu') is True
+            assert [e['email'] for e in lab_utils.get_queue('turtlebot')] == ['b@b.edu']
+
+    def test_queue_write_invalidates_cache(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            lab_utils.get_queue('turtlebot')
+            lab_utils.add_to_queue('turtlebot', 'Bob', 'b@b.edu')
+            result = lab_utils.get_queue('turtlebot')
+        assert [e['name'] for e in result] == ['Alice', 'Bob']
+
+    def test_queue_index_maps_email_to_position(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\nBob,b@b.edu\n")
+        rows, positions = lab_utils._load_queue_csv(str(tb))
+        assert rows == (('Alice', 'a@b.edu'), ('Bob', 'b@b.edu'))
+        assert positions == {'a@b.edu': 0, 'b@b.edu': 1}
+
+    def test_reorder_uses_cached_index(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\nBob,b@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            lab_utils.get_queue('turtlebot')
+            with mock.patch.object(lab_utils, 'iter_csv_columns') as parse:
+                assert lab_utils.reorder_queue('turtlebot', 'a@b.edu', 'down') == (True, None)
+            parse.assert_not_called()
+            assert [e['name'] for e in lab_utils.get_queue('turtlebot')] == ['Bob', 'Alice']
+
+    def test_reorder_rewrites_quoted_rows(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text('name,email\nAlice,a@b.edu\n"Bob, Jr.",b@b.edu\n')
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            assert lab_utils.reorder_queue('turtlebot', 'b@b.edu', 'up') == (True, None)
+        assert tb.read_text() == 'name,email\n"Bob, Jr.",b@b.edu\nAlice,a@b.edu\n'
+
+    def test_reposition_and_clear(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\nBob,b@b.edu\nCara,c@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            assert lab_utils.reposition_queue('turtlebot', 'c@b.edu', 0) == (True, None)
+            assert [e['name'] for e in lab_utils.get_queue('turtlebot')] == ['Cara', 'Alice', 'Bob']
+            assert lab_utils.clear_queue('turtlebot') is True
+            assert lab_utils.get_queue('turtlebot') == []
+        assert tb.read_text() == "name,email\n"
+
+
+class TestAddToQueueCSV:
+    def test_creates_file_with_header(self, tmp_path):
+        tb = tmp_path / "csv" / "queue_turtlebot.csv"
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            assert lab_utils.add_to_queue('turtlebot', 'Alice', 'a@b.edu') == (True, None)
+        assert tb.read_text().splitlines() == ['name,email', 'Alice,a@b.edu']
+
+    def test_appends_row_to_existing_queue(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            assert lab_utils.add_to_queue('turtlebot', 'Bob, Jr.', 'b@b.edu') == (True, None)
+            assert lab_utils.get_queue('turtlebot')[-1] == {'name': 'Bob, Jr.', 'email': 'b@b.edu'}
+
+    def test_duplicate_rejected_without_write(self, tmp_path):
+        tb = tmp_path / "queue_turtlebot.csv"
+        tb.write_text("name,email\nAlice,a@b.edu\n")
+        with mock.patch.object(lab_utils, 'QUEUE_TURTLEBOT_CSV_PATH', str(tb)):
+            lab_utils.get_queue('turtlebot')
+            success, error = lab_utils.add_to_queue('turtlebot', 'Alice', 'a@b.edu')
+        assert success is False
+        assert 'already in this queue' in error
+        assert tb.read_text() == "name,email\nAlice,a@b.edu\n"
+
+
 # ---------------------------------------------------------------------------
 # get_manual_overrides
 # ---------------------------------------------------------------------------
@@ -152,6 +408,21 @@ class TestGetManualOverrides:
             result = lab_utils.get_manual_overrides()
         assert result == {}
 
+    def test_unchanged_file_not_reparsed(self, overrides_csv):
+        with mock.patch.object(lab_utils, 'MANUAL_OVERRIDES_CSV_PATH', overrides_csv):
+            lab_utils.get_manual_overrides()
+            with mock.patch.object(lab_utils, 'iter_csv_columns') as parse:
+                result = lab_utils.get_manual_overrides()
+            parse.assert_not_called()
+        assert result == {3: True, 7: False}
+
+    def test_set_override_invalidates_cache(self, overrides_csv):
+        with mock.patch.object(lab_utils, 'MANUAL_OVERRIDES_CSV_PATH', overrides_csv):
+            lab_utils.get_manual_overrides()
+            lab_utils.set_manual_override(3, None)
+            result = lab_utils.get_manual_overrides()
+        assert result == {7: False}
+
     def test_malformed_file_returns_empty(self, tmp_path):
         bad_csv = tmp_path / "bad.csv"
         bad_csv.write_text("garbage data no headers")
@@ -160,6 +431,79 @@ class TestGetManualOverrides:
         assert result == {}
 
 
+# ---------------------------------------------------------------------------
+# get_claimed_stations (CSV)
+# ---------------------------------------------------------------------------
+
+class TestGetClaimedStationsCSV:
+    def test_active_and_confirmed_claims(self, tmp_path):
+        future = (datetime.now() + timedelta(minutes=3)).isoformat()
+        past = (datetime.now() - timedelta(minutes=1)).isoformat()
+        claims = tmp_path / "pending_claims.csv"
+        claims.write_text(
+            "email,name,station_type,station,claim_token,expires_at,confirmed\n"
+            f"a@b.edu,Alice,turtlebot,1,t1,{future},false\n"
+            f"b@b.edu,Bob,turtlebot,2,t2,{past},false\n"
+            f"c@b.edu,Carol,ur7e,6,t3,{past},true\n"
+            f"d@b.edu,Dan,ur7e,,t4,{future},false\n"
+        )
+        with mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(claims)):
+            result = lab_utils.get_claimed_stations()
+        assert sorted(result) == [1, 6]
+        assert result[1]['name'] == 'Alice'
+        assert result[1]['confirmed'] is False
+        assert result[6]['confirmed'] is True
+        assert result[6]['time_remaining'] == 0
+
+    def test_old_header_without_station_column(self, tmp_path, capsys):
+        future = (datetime.now() + timedelta(minutes=3)).isoformat()
+        claims = tmp_path / "pending_claims.csv"
+        claims.write_text("email,name,station_type,claim_token,expires_at\n"
+                          f"a@b.edu,Alice,turtlebot,t1,{future}\n")
+        with mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(claims)):
+            assert lab_utils.get_claimed_stations() == {}
+        assert capsys.readouterr().out == ''
+
+
+class TestCreatePendingClaimCSV:
+    def test_creates_file_with_header(self, tmp_path):
+        claims = tmp_path / "pending_claims.csv"
+        expires = datetime(2024, 1, 2, 3, 4, 5)
+        with mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(claims)):
+            assert lab_utils.create_pending_claim('a@b.edu', 'Alice', 'turtlebot', 1, 't1', expires)
+            assert lab_utils.get_all_pending_claims() == [{
+                'email': 'a@b.edu', 'name': 'Alice', 'station_type': 'turtlebot',
+                'station': '1', 'claim_token': 't1',
+                'expires_at': '2024-01-02T03:04:05', 'confirmed': 'false',
+            }]
+
+    def test_appends_without_rewriting_existing_rows(self, tmp_path):
+        claims = tmp_path / "pending_claims.csv"
+        existing = ("email,name,station_type,station,claim_token,expires_at,confirmed\r\n"
+                    "a@b.edu,Alice,turtlebot,1,t1,2024-01-02T03:04:05,true\r\n")
+        claims.write_bytes(existing.encode())
+        with mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(claims)), \
+             mock.patch.object(lab_utils, 'replace_file') as rewrite:
+            lab_utils.create_pending_claim('b@b.edu', 'Bob, Jr.', 'ur7e', 6, 't2',
+                                           '2024-01-02T03:09:05')
+        rewrite.assert_not_called()
+        assert claims.read_bytes().decode() == existing + \
+            'b@b.edu,"Bob, Jr.",ur7e,6,t2,2024-01-02T03:09:05,false\r\n'
+
+    def test_old_header_is_rewritten_not_appended(self, tmp_path):
+        claims = tmp_path / "pending_claims.csv"
+        expires = (datetime.now() + timedelta(minutes=5)).isoformat()
+        claims.write_text("email,name,station_type,claim_token,expires_at\n"
+                          f"a@b.edu,Alice,turtlebot,t1,{expires}\n")
+        with mock.patch.object(lab_utils, 'PENDING_CLAIMS_CSV_PATH', str(claims)):
+            assert lab_utils.create_pending_claim('b@b.edu', 'Bob', 'ur7e', 6, 'tok', expires)
+            claim = lab_utils.get_pending_claim('tok')
+            assert claim['station'] == '6'
+            assert claim['expires_at'] == expires
+            assert lab_utils.get_pending_claim('t1')['email'] == 'a@b.edu'
+        assert claims.read_text().splitlines()[0] == ','.join(lab_utils.PENDING_CLAIMS_FIELDS)
+
+
 # ---------------------------------------------------------------------------
 # Calendar event parsing & caching
 # ---------------------------------------------------------------------------